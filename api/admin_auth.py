@@ -7,6 +7,8 @@ from fastapi.security.api_key import APIKeyHeader
 # --- Configuration ---
 # Get your secret key from an environment variable
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+# Encoded once; compare_digest on bytes also copes with non-ASCII header values
+_ADMIN_KEY_BYTES = ADMIN_API_KEY.encode() if ADMIN_API_KEY else None
 
 # Define the header we expect to find the key in
 api_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
@@ -15,13 +17,13 @@ async def get_admin_access(key: str = Security(api_key_header)):
     """
     Dependency that checks for a valid admin API key in the X-Admin-Key header.
     """
-    if not ADMIN_API_KEY:
+    if not _ADMIN_KEY_BYTES:
         # This is a server configuration error, not a client error.
         raise HTTPException(
             status_code=500, detail="Admin API key is not configured on the server."
         )
     
-    if key and hmac.compare_digest(key, ADMIN_API_KEY):
+    if key and hmac.compare_digest(key.encode(), _ADMIN_KEY_BYTES):
         # If the key is present and correct, allow access.
         return True
     else:
@@ -5,26 +5,25 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 import argparse
+import asyncio
 import logging
 import os
-import sqlite3
 import stripe
 import hashlib
-import httpx
 from pathlib import Path
 
 from auth import AuthUser
 from auth0_manager import delete_user
 
 # Import routers from our modules
-from marketplace import marketplace_router
+from marketplace import marketplace_router, delete_agents_by_author
 from compute import compute_router
 from tools_router import tools_router
 from messaging import messaging_router
 from payments import payments_router
 from apple_payments import apple_payments_router
 from transcriptions import transcriptions_router
-import api_handlers
+import http_client
 
 # Setup logging
 logging.basicConfig(
@@ -45,9 +44,9 @@ MAX_BODY_SIZE = 20 * 1024 * 1024  # 20 MB
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await api_handlers.startup_handlers()
+    await http_client.startup_http_client()
     yield
-    await api_handlers.shutdown_handlers()
+    await http_client.shutdown_http_client()
 
 # Setup FastAPI app
 app = FastAPI(lifespan=lifespan)
@@ -126,8 +125,8 @@ async def live_status():
         "type": "video",
         "key": api_key,
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params, timeout=10)
+    client = http_client.get_http_client()
+    resp = await client.get(url, params=params, timeout=10)
 
     if resp.status_code != 200:
         _live_cache["last_checked"] = now
@@ -209,12 +208,7 @@ async def delete_account(current_user: AuthUser):
 
     # 2. Delete marketplace agents created by this user
     try:
-        conn = sqlite3.connect("marketplace.db")
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM agents WHERE author_id = ?", (user_id,))
-        deleted_agents = cursor.rowcount
-        conn.commit()
-        conn.close()
+        deleted_agents = await asyncio.to_thread(delete_agents_by_author, user_id)
         logger.info(f"Deleted {deleted_agents} marketplace agents for user {user_id}")
     except Exception as e:
         logger.error(f"Failed to delete marketplace agents for user {user_id}: {e}")
@@ -248,4 +242,5 @@ if __name__ == "__main__":
     print(f"  Compute quota: http://localhost:{args.port}/quota")
     print(f"  Proxy forwarding to: {args.proxy_target}")
 
-    uvicorn.run(app, host="0.0.0.0", port=args.port)
+    # "auto" runs on uvloop when it is installed (see requirements.txt), asyncio otherwise
+    uvicorn.run(app, host="0.0.0.0", port=args.port, loop="auto")
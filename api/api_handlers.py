@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
+import asyncio
 import os
-import json
-from datetime import datetime
-from pathlib import Path
+import re
+import orjson
 import logging
 import httpx
-from typing import Optional
+from collections import deque
+
+from http_client import get_http_client # Re-exported for the handler modules
 
 logger = logging.getLogger("api_handlers")
 # Basic logging setup if not configured elsewhere
@@ -14,32 +16,6 @@ logger = logging.getLogger("api_handlers")
 # Global registry for API handlers
 API_HANDLERS = {}
 
-# Shared HTTP client - one connection pool for the process lifetime
-_shared_http_client: Optional[httpx.AsyncClient] = None
-
-def get_http_client() -> httpx.AsyncClient:
-    """Return the shared HTTP client. Requires startup_handlers() to have run."""
-    if _shared_http_client is None:
-        raise RuntimeError("Shared HTTP client not initialized.")
-    return _shared_http_client
-
-async def startup_handlers():
-    """Initialize shared resources. Called from FastAPI lifespan on startup."""
-    global _shared_http_client
-    _shared_http_client = httpx.AsyncClient(
-        timeout=120.0,
-        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
-    )
-    logger.info("Shared HTTP client initialized")
-
-async def shutdown_handlers():
-    """Close shared resources. Called from FastAPI lifespan on shutdown."""
-    global _shared_http_client
-    if _shared_http_client:
-        await _shared_http_client.aclose()
-        _shared_http_client = None
-        logger.info("Shared HTTP client closed")
-
 class HandlerError(Exception):
     """Custom exception for handler-specific errors."""
     def __init__(self, message, status_code=500):
@@ -57,11 +33,155 @@ class BackendAPIError(HandlerError):
         super().__init__(message, status_code)
 
 
+def model_field_rewrite(actual_model_id: str, display_model_name: str):
+    """
+    Build a (pattern, template) pair that swaps the upstream `"model": "<actual id>"`
+    field for the display name directly in raw response bytes, for use as
+    `pattern.sub(template, data, count=1)`. A `"model"` key inside generated text
+    is JSON-escaped and can't match.
+    """
+    pattern = re.compile(rb'("model"\s*:\s*)' + re.escape(orjson.dumps(actual_model_id)))
+    template = rb"\g<1>" + orjson.dumps(display_model_name).replace(b"\\", b"\\\\")
+    return pattern, template
+
+async def aiter_sse_lines(response: httpx.Response):
+    """
+    Yield the lines of a streamed upstream response as bytes, without line endings.
+    Unlike response.aiter_lines(), nothing is decoded to str.
+    """
+    buffer = b""
+    async for chunk in response.aiter_bytes():
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line[:-1] if line.endswith(b"\r") else line
+    if buffer:
+        yield buffer
+
+def rewrite_model_field(data: bytes, rewrite, display_model_name: str) -> bytes:
+    """
+    Return the JSON document `data` with its model field showing the display name.
+    Patched as bytes; only a document that names some other model id (e.g. a resolved
+    or versioned slug) goes through a parse/re-serialize. Unparseable input is
+    returned unchanged.
+    """
+    pattern, template = rewrite
+    patched, count = pattern.subn(template, data, count=1)
+    if count or b'"model"' not in data:
+        return patched
+    try:
+        doc = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return data
+    if isinstance(doc, dict) and "model" in doc:
+        doc["model"] = display_model_name
+        return orjson.dumps(doc)
+    return data
+
+def rewrite_sse_chunk(data: bytes, rewrite, display_model_name: str) -> bytes:
+    """Return the SSE event for one upstream `data:` payload, via rewrite_model_field()."""
+    return b"data: " + rewrite_model_field(data, rewrite, display_model_name) + b"\n\n"
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one upstream. It starts at `maximum` (unless
+    `initial` is given) and only shrinks on real overload: an overload response
+    (429/503) halves it, and each success then raises it by about one per
+    window of requests until it is back at the ceiling.
+    Requests over the limit wait up to `queue_timeout` seconds, then fail fast
+    with a 503 instead of piling onto a struggling upstream.
+
+    acquire() returns a LimiterSlot; release it once the upstream work is over,
+    which for a streamed response is when the stream ends.
+    """
+    OVERLOAD_STATUS_CODES = frozenset({429, 503})
+
+    def __init__(self, name, initial=None, minimum=1, maximum=64, backoff=0.5, queue_timeout=30.0):
+        self.name = name
+        self.limit = float(maximum if initial is None else min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()  # Futures of queued acquire() calls, oldest first
+
+    async def acquire(self) -> "LimiterSlot":
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return LimiterSlot(self)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on
+                self._free(None, adjust=False)
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass # A release between the cancel and now already dropped it
+            if isinstance(e, TimeoutError):
+                logger.warning("Shedding request for '%s': %d in flight, limit %d", self.name, self.in_flight, int(self.limit))
+                raise BackendAPIError(f"Upstream '{self.name}' is overloaded, please retry shortly", status_code=503) from None
+            raise
+        return LimiterSlot(self)
+
+    def _free(self, exc, adjust):
+        self.in_flight -= 1
+        if adjust:
+            if isinstance(exc, BackendAPIError) and exc.status_code in self.OVERLOAD_STATUS_CODES:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                logger.warning("Upstream '%s' overloaded (%s); concurrency limit now %d", self.name, exc.status_code, int(self.limit))
+            elif exc is None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        # Hand freed capacity straight to the oldest waiters
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class LimiterSlot:
+    """One acquired AdaptiveLimiter slot. release() is synchronous and only counts once."""
+    __slots__ = ("_limiter", "_released")
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self._limiter = limiter
+        self._released = False
+
+    def release(self, exc: BaseException | None = None, adjust: bool = True):
+        """
+        Free the slot. `exc` is the failure, if any; None counts as a success.
+        With adjust=False the limit is left alone (the request never reached the
+        upstream, or was abandoned by the client).
+        """
+        if self._released:
+            return
+        self._released = True
+        self._limiter._free(exc, adjust)
+
+
 class BaseAPIHandler:
     """Base class for asynchronous API handlers."""
     def __init__(self, name):
+        if name in API_HANDLERS:
+            # A second instance would silently replace the first and desync MODEL_INDEX
+            raise ValueError(f"API handler '{name}' is already registered")
         self.name = name
         self.models = []  # List of supported models { "name": "model-id", "parameters": "optional", ... }
+        self._v1_model_entries = None  # Built on first use by get_v1_model_entries()
+        # Held by compute.py for the whole request, including a streamed body.
+        # Ceiling configurable per handler, e.g. GEMINI_PRO_MAX_CONCURRENCY.
+        max_concurrency = int(os.getenv(f"{name.upper().replace('-', '_')}_MAX_CONCURRENCY", "64"))
+        self.limiter = AdaptiveLimiter(name, maximum=max_concurrency)
         API_HANDLERS[name] = self
         logger.info("Registered API handler: '%s'", name)
         # Optional: Create a shared httpx client if needed across handlers (managing lifecycle is key)
@@ -71,6 +191,28 @@ class BaseAPIHandler:
         """Return the list of models supported by this handler."""
         return self.models
 
+    def get_v1_model_entries(self):
+        """
+        Return this handler's models in OpenAI /v1/models shape.
+        Built once and reused; rebuild_model_index() clears it.
+        """
+        if self._v1_model_entries is None:
+            self._v1_model_entries = [
+                {
+                    "id": model_info.get("name", ""), # The standard uses 'id' for the model name
+                    "object": "model",
+                    "created": 0, # Placeholder, as it's not strictly needed by the UI
+                    "owned_by": self.name,
+
+                    # --- Custom fields needed by the Observer frontend ---
+                    "parameter_size": model_info.get("parameters", "N/A"),
+                    "multimodal": model_info.get("multimodal", False),
+                    "pro": model_info.get("pro", False)
+                }
+                for model_info in self.get_models()
+            ]
+        return self._v1_model_entries
+
     async def handle_request(self, request_data: dict) -> dict:
         """
         Process the request asynchronously.
@@ -80,7 +222,8 @@ class BaseAPIHandler:
             request_data: The parsed JSON request data (dictionary).
 
         Returns:
-            A dictionary representing the successful JSON response payload.
+            A dictionary representing the successful JSON response payload,
+            a Response carrying an already-serialized body, or a StreamingResponse.
 
         Raises:
             ConfigError: If configuration (like API key) is missing.
@@ -109,11 +252,29 @@ openrouter_handler = OpenRouterAPIHandler()
 
 logger.info("Initialized API Handlers. Available: %s", list(API_HANDLERS.keys()))
 
-# Pre-built model-name → handler lookup (avoids O(handlers × models) search per request)
-MODEL_TO_HANDLER = {
-    m["name"]: handler
-    for handler in API_HANDLERS.values()
-    for m in handler.get_models()
-}
-logger.info("Model-to-handler index built. Models: %s", list(MODEL_TO_HANDLER.keys()))
+# Pre-built model-name → (handler, model_info) lookup, so routing and tier checks
+# cost a single dict lookup per request
+MODEL_INDEX: dict[str, tuple[BaseAPIHandler, dict]] = {}
+# Bumped on every rebuild so derived caches (e.g. the /v1/models body) know to refresh
+MODEL_INDEX_VERSION = 0
+
+def rebuild_model_index():
+    """
+    (Re)build MODEL_INDEX from the registered handlers.
+    Updated in place so modules holding a reference see the new entries.
+    Call again if a handler is registered after import.
+    """
+    global MODEL_INDEX_VERSION
+    MODEL_INDEX_VERSION += 1
+    for handler in API_HANDLERS.values():
+        handler._v1_model_entries = None
+    MODEL_INDEX.clear()
+    MODEL_INDEX.update(
+        (m["name"], (handler, m))
+        for handler in API_HANDLERS.values()
+        for m in handler.get_models()
+    )
+    logger.info("Model index built. Models: %s", list(MODEL_INDEX.keys()))
+
+rebuild_model_index()
 # --- End Handler Instantiation ---
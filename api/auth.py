@@ -1,9 +1,12 @@
 # auth.py
 
 import os
+import asyncio
+import time
+import hashlib
 from fastapi import Request, HTTPException, status, Depends
 from jose import jwt
-from jwt import PyJWKClient, PyJWTError
+from jwt import PyJWKClient, PyJWTError, get_unverified_header
 import logging
 from typing import Annotated, Optional, Dict, Any
 from pydantic import BaseModel 
@@ -22,7 +25,70 @@ CUSTOM_CLAIM_NAMESPACE = f"https://{os.environ.get('APP_DOMAIN', 'observer-ai.co
 
 # --- JWKS Client ---
 jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-jwks_client = PyJWKClient(jwks_url, cache_jwk_set=True, lifespan=3600)
+JWKS_CACHE_LIFESPAN = 3600
+jwks_client = PyJWKClient(jwks_url, cache_jwk_set=True, lifespan=JWKS_CACHE_LIFESPAN)
+
+# kid -> verification key, so finding a token's key is one dict lookup rather than
+# a scan of the key set. Emptied on the JWKS lifespan so retired keys drop out.
+_signing_keys: Dict[str, Any] = {}
+_signing_keys_expire_at = 0.0
+
+def _signing_key_for(token: str):
+    """Return the key that verifies `token`, fetching it from the JWKS client on first sight of its kid."""
+    global _signing_keys_expire_at
+    now = time.monotonic()
+    if now >= _signing_keys_expire_at:
+        _signing_keys.clear()
+        _signing_keys_expire_at = now + JWKS_CACHE_LIFESPAN
+
+    kid = get_unverified_header(token).get("kid")
+    key = _signing_keys.get(kid)
+    if key is None:
+        # The client refetches the key set when it doesn't know the kid (key rotation)
+        key = _signing_keys[kid] = jwks_client.get_signing_key(kid).key
+    return key
+
+# --- Verified Token Cache ---
+# Clients send the same token with every request; remembering its claims for a short
+# while skips the signing-key lookup and RS256 verification on repeat requests.
+# An entry never outlives the token's own `exp`.
+TOKEN_CACHE_TTL = 60
+_TOKEN_CACHE_MAX = 10_000
+_verified_tokens: Dict[bytes, tuple[float, Dict[str, Any]]] = {}  # token digest -> (valid until, claims)
+
+def _verify_token(token: str) -> Dict[str, Any]:
+    """Blocking part of validation: JWKS fetch on a new kid, then the RS256 check."""
+    return jwt.decode(
+        token,
+        _signing_key_for(token),
+        algorithms=ALGORITHMS,
+        audience=API_AUDIENCE,
+        issuer=ISSUER,
+        options={"verify_exp": True}
+    )
+
+async def _decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify the token and return its claims, reusing a recent verification of the same token.
+    Raises the same errors as jwt.decode() for an invalid token.
+    """
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    cached = _verified_tokens.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    # In a worker thread so a slow JWKS fetch or the signature math doesn't stall the event loop
+    payload = await asyncio.to_thread(_verify_token, token)
+
+    if len(_verified_tokens) >= _TOKEN_CACHE_MAX:
+        expired = [k for k, (valid_until, _) in _verified_tokens.items() if valid_until <= now]
+        for k in expired:
+            del _verified_tokens[k]
+        if len(_verified_tokens) >= _TOKEN_CACHE_MAX:
+            _verified_tokens.clear()
+    _verified_tokens[cache_key] = (min(payload.get("exp", now), now + TOKEN_CACHE_TTL), payload)
+    return payload
 
 # --- Pydantic Model for User Data ---
 # This creates a structured object to hold user info from the token.
@@ -55,16 +121,7 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
     token = auth_header.split(" ")[1]
 
     try:
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-
-        payload = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=ALGORITHMS,
-            audience=API_AUDIENCE,
-            issuer=ISSUER,
-            options={"verify_exp": True}
-        )
+        payload = await _decode_token(token)
         
         user_id = payload.get("sub")
         if user_id is None:
@@ -114,16 +171,7 @@ async def verify_token_from_string(token: str) -> Optional[AuthenticatedUser]:
     Returns AuthenticatedUser or None if invalid.
     """
     try:
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-
-        payload = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=ALGORITHMS,
-            audience=API_AUDIENCE,
-            issuer=ISSUER,
-            options={"verify_exp": True}
-        )
+        payload = await _decode_token(token)
 
         user_id = payload.get("sub")
         if user_id is None:
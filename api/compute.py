@@ -1,10 +1,16 @@
 # compute.py
 
 from fastapi import APIRouter, Request, HTTPException, status, Depends
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import hashlib
 import logging
-import json
-from collections import defaultdict
+import os
+import orjson
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from threading import Lock
 
@@ -12,10 +18,9 @@ from threading import Lock
 from auth import AuthUser
 from admin_auth import get_admin_access
 # Import the new, specific functions and the QUOTA_LIMITS dictionary
-from quota_manager import increment_usage, get_usage_for_service, check_usage, QUOTA_LIMITS, PRO_QUOTA_LIMITS, MAX_QUOTA_LIMITS, PLUS_QUOTA_LIMITS
+from quota_manager import allow_request_burst, increment_and_check, get_usage_for_service, QUOTA_LIMITS, PRO_QUOTA_LIMITS, MAX_QUOTA_LIMITS, PLUS_QUOTA_LIMITS
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+# Logging is configured by the app entry point (api.py); this module only emits records
 logger = logging.getLogger('compute_router')
 
 # --- Observer AI Handler Integration ---
@@ -25,22 +30,61 @@ try:
     logger.info("Successfully imported api_handlers. Available handlers: %s", list(api_handlers.API_HANDLERS.keys()))
     HANDLERS_AVAILABLE = True
 except ImportError as e:
-    logger.error(f"Could not import api_handlers: {e}. Backend routing will not work.", exc_info=True)
+    logger.error("Could not import api_handlers: %s. Backend routing will not work.", e, exc_info=True)
     api_handlers, HandlerError, ConfigError, BackendAPIError, HANDLERS_AVAILABLE = (None, Exception, Exception, Exception, False)
 # --- End Integration ---
 
 compute_router = APIRouter()
 
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (faster, bytes out, no separate encode step)."""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
 # --- Agent Creator Models Configuration ---
-AGENT_CREATOR_MODELS = {
+AGENT_CREATOR_MODELS = frozenset({
     "gemini-2.0-flash-lite-free",
     "gemini-2.5-flash-lite-free"
+})
+
+# Agent creator models and other hidden models are left out of the public /v1/models listing
+V1_MODELS_EXCLUDED = AGENT_CREATOR_MODELS | {"gemini-2.5-pro"}
+
+# --- User Tiers ---
+# Quota table and log label per tier, so the chat and /quota paths resolve a user's
+# tier once and then only do dict lookups
+TIER_QUOTA_LIMITS = {
+    "max": MAX_QUOTA_LIMITS,
+    "plus": PLUS_QUOTA_LIMITS,
+    "pro": PRO_QUOTA_LIMITS,
+    "free": QUOTA_LIMITS,
 }
+_USER_TYPE_LABELS = {"max": "MAX", "plus": "PLUS", "pro": "PRO", "free": "free"}
+
+def _user_tier(user) -> str:
+    """Return the user's tier name: "max", "plus", "pro" or "free"."""
+    if user.is_max:
+        return "max"
+    if user.is_plus:
+        return "plus"
+    if user.is_pro:
+        return "pro"
+    return "free"
 
 # --- Metrics Logging System (Memory-Only) ---
 # Similar to quota_manager.py pattern - all in memory
-_conversation_metrics = []
-_metrics_lock = Lock()
+# Ring buffer of the last 1000 entries; the oldest are evicted on append.
+# No lock: the writer thread's extend() and the admin read's list() each run entirely
+# in C under the GIL. A free-threaded (no-GIL) build would need one again.
+_conversation_metrics = deque(maxlen=1000)
+# Request handlers only enqueue; _metrics_writer applies entries off the request path
+_metrics_queue = queue.Queue(maxsize=10000)
+_metrics_dropped = 0  # Entries discarded because the queue was full
+# Optional: also append every entry as a JSONL line to this file (written by _metrics_writer only)
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH")
+_metrics_log_file = None
 
 # --- Hourly Status Aggregates (for /status endpoint) ---
 _hourly_aggregates = defaultdict(dict)  # {model: {hour: {"success": int, "total": int} or float}}
@@ -90,19 +134,49 @@ def update_hourly_stats(model: str, timestamp: str, is_success: bool):
 
         except Exception as e:
             # Don't crash the request if stats tracking fails
-            logger.error(f"Error updating hourly stats for {model}: {e}")
+            logger.error("Error updating hourly stats for %s: %s", model, e)
 
 def log_conversation_metrics(user_id: str, prompt_text: str, response_text: str,
                            handler: str, model: str, status_code: int, image_count: int = 0,
                            time_to_first_token: float = None, chunks_per_second: float = None,
                            request_data: dict = None):
-    """Log conversation metrics to memory (no disk I/O)."""
-    timestamp = datetime.now().isoformat()
-
+    """
+    Queue conversation metrics for the background writer (memory only, no disk I/O).
+    Only the timestamp is taken here; the entry itself is built by _metrics_writer.
+    Only Agent Creator entries read the messages, so nothing else of request_data is queued.
+    """
+    global _metrics_dropped
+    messages = request_data.get("messages") if request_data and model in AGENT_CREATOR_MODELS else None
+    try:
+        _metrics_queue.put_nowait((
+            time.time_ns(), user_id, prompt_text, response_text, handler, model,
+            status_code, image_count, time_to_first_token, chunks_per_second, messages,
+        ))
+    except queue.Full:
+        _metrics_dropped += 1
+        logger.warning("Metrics queue full, dropping entry for model %s (%d dropped in total)", model, _metrics_dropped)
+
+@dataclass(slots=True)
+class MetricEntry:
+    """One stored conversation metrics record; serialized field-for-field by orjson."""
+    timestamp: str
+    user_id: str
+    prompt: str
+    response: str
+    handler: str
+    model: str
+    status_code: int
+    image_count: int
+    time_to_first_token: float | None
+    chunks_per_second: float | None
+
+def _build_metrics_entry(timestamp_ns: int, user_id: str, prompt_text: str, response_text: str,
+                         handler: str, model: str, status_code: int, image_count: int,
+                         time_to_first_token: float, chunks_per_second: float,
+                         messages: list | None) -> MetricEntry:
+    """Turn a queued log_conversation_metrics() call into a stored metrics entry."""
     # For Agent Creator models, parse messages array to get clean latest exchange
-    if model in AGENT_CREATOR_MODELS and request_data and "messages" in request_data:
-        messages = request_data["messages"]
-
+    if messages is not None:
         # Extract the latest user message
         user_message = ""
         for msg in reversed(messages):
@@ -124,38 +198,75 @@ def log_conversation_metrics(user_id: str, prompt_text: str, response_text: str,
         final_prompt = prompt_text[-500:] if prompt_text else ""
         final_response = response_text[:500] if response_text else ""
 
-    with _metrics_lock:
-        entry = {
-            "timestamp": timestamp,
-            "user_id": user_id,
-            "prompt": final_prompt,
-            "response": final_response,
-            "handler": handler,
-            "model": model,
-            "status_code": status_code,
-            "image_count": image_count,
-            "time_to_first_token": time_to_first_token,
-            "chunks_per_second": chunks_per_second
-        }
-        _conversation_metrics.append(entry)
-
-        # Keep only last 1000 entries to prevent memory bloat
-        if len(_conversation_metrics) > 1000:
-            _conversation_metrics.pop(0)
+    return MetricEntry(
+        timestamp=datetime.fromtimestamp(timestamp_ns / 1e9).isoformat(),
+        user_id=user_id,
+        prompt=final_prompt,
+        response=final_response,
+        handler=handler,
+        model=model,
+        status_code=status_code,
+        image_count=image_count,
+        time_to_first_token=time_to_first_token,
+        chunks_per_second=chunks_per_second,
+    )
+
+def _apply_metrics_batch(batch: list):
+    """Store a batch of metric entries and fold them into the hourly aggregates."""
+    _conversation_metrics.extend(batch)
 
     # Update hourly status aggregates (for /status endpoint)
-    is_success = status_code < 400
-    update_hourly_stats(model, timestamp, is_success)
+    for entry in batch:
+        update_hourly_stats(entry.model, entry.timestamp, entry.status_code < 400)
+
+def _append_metrics_log(batch: list):
+    """Append a batch to METRICS_LOG_PATH as orjson JSONL in a single write."""
+    global _metrics_log_file
+    if _metrics_log_file is None:
+        _metrics_log_file = open(METRICS_LOG_PATH, "ab")
+    _metrics_log_file.write(b"".join(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE) for entry in batch))
+    _metrics_log_file.flush()
+
+def _metrics_writer():
+    """Background loop: block for one call, then take everything else already queued and build the entries."""
+    while True:
+        pending = [_metrics_queue.get()]
+        while True:
+            try:
+                pending.append(_metrics_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            batch = [_build_metrics_entry(*args) for args in pending]
+        except Exception as e:
+            logger.error("Error building metrics batch: %s", e)
+            continue
+        if METRICS_LOG_PATH:
+            # Serialized before the entries become visible to the admin endpoint
+            try:
+                _append_metrics_log(batch)
+            except OSError as e:
+                logger.error("Error writing metrics log %s: %s", METRICS_LOG_PATH, e)
+        try:
+            _apply_metrics_batch(batch)
+        except Exception as e:
+            logger.error("Error applying metrics batch: %s", e)
+
+_metrics_writer_thread = threading.Thread(target=_metrics_writer, name="metrics-writer", daemon=True)
+_metrics_writer_thread.start()
 
 def get_all_conversation_metrics() -> list:
     """Get all conversation metrics (for admin endpoint)."""
-    import hashlib
-    with _metrics_lock:
-        metrics_copy = list(_conversation_metrics)  # Return copy
-        for metric in metrics_copy:
-            user_id = metric.get("user_id")
-            metric["user"] = hashlib.sha256(user_id.encode()).hexdigest()[:8] if user_id else None
-        return metrics_copy
+    snapshot = list(_conversation_metrics)
+
+    # Converted to dicts here, on the (rare) admin read
+    metrics_copy = []
+    for metric in snapshot:
+        entry = asdict(metric)
+        user_id = metric.user_id
+        entry["user"] = hashlib.sha256(user_id.encode()).hexdigest()[:8] if user_id else None
+        metrics_copy.append(entry)
+    return metrics_copy
 
 def get_hourly_status() -> dict:
     """
@@ -237,17 +348,20 @@ def get_hourly_status() -> dict:
 
 async def _log_streaming_response(stream_iterator, user_id: str, prompt_text: str,
                                  handler: str, model: str, image_count: int = 0,
-                                 request_data: dict = None):
+                                 request_data: dict = None, slot=None):
     """
     Wrapper that logs complete streaming response with timing metrics.
     Accumulates content from OpenAI SSE chunks and logs when stream completes.
+    Releases the handler's concurrency slot (`slot`) once the stream is over;
+    an error the handler raises after its error frame (e.g. an upstream 429)
+    is passed along so the limiter can back off.
     """
-    import time
-
     response_parts = []
     start_time = time.time()
     first_token_time = None
     total_chunks = 0
+    stream_error = None
+    finished = False  # False if the client went away mid-stream
 
     try:
         async for chunk in stream_iterator:
@@ -261,7 +375,7 @@ async def _log_streaming_response(stream_iterator, user_id: str, prompt_text: st
                     try:
                         json_data = chunk_str[6:].strip()  # Remove "data: " prefix
                         if json_data:
-                            chunk_json = json.loads(json_data)
+                            chunk_json = orjson.loads(json_data)
                             choices = chunk_json.get("choices", [])
                             if choices and "delta" in choices[0]:
                                 content = choices[0]["delta"].get("content")
@@ -271,7 +385,7 @@ async def _log_streaming_response(stream_iterator, user_id: str, prompt_text: st
                                         first_token_time = time.time()
                                     response_parts.append(content)
                                     total_chunks += 1
-                    except (json.JSONDecodeError, KeyError, IndexError):
+                    except (orjson.JSONDecodeError, KeyError, IndexError):
                         # Skip malformed chunks
                         continue
 
@@ -301,19 +415,41 @@ async def _log_streaming_response(stream_iterator, user_id: str, prompt_text: st
             chunks_per_second=chunks_per_second,
             request_data=request_data
         )
+        finished = True
 
     except Exception as e:
+        stream_error = e
+        finished = True
         # Log error if stream fails
         log_conversation_metrics(
             user_id=user_id,
             prompt_text=prompt_text,
-            response_text=f"STREAM_ERROR: {str(e)}",
+            response_text=f"STREAM_ERROR: {e}",
             handler=handler,
             model=model,
-            status_code=500,
+            status_code=getattr(e, "status_code", 500),
             image_count=image_count,
             request_data=request_data
         )
+    finally:
+        if slot is not None:
+            slot.release(stream_error, adjust=finished)
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that frees its limiter slot however the response ends.
+    Backstop for a body iterator that never starts (client gone before the
+    first chunk), whose own finally block would then never run.
+    """
+    def __init__(self, *args, slot, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release(adjust=False)
 
 # --- API Routes ---
 
@@ -341,24 +477,14 @@ async def check_quota_endpoint(current_user: AuthUser):
     Requires a valid JWT. Pro and Max users will show their tier limits.
     """
     # Determine user tier and limits
-    if current_user.is_max:
-        tier = "max"
-        limit = MAX_QUOTA_LIMITS["monitor"]
-    elif current_user.is_plus:
-        tier = "plus"
-        limit = PLUS_QUOTA_LIMITS["monitor"]
-    elif current_user.is_pro:
-        tier = "pro"
-        limit = PRO_QUOTA_LIMITS["monitor"]
-    else:
-        tier = "free"
-        limit = QUOTA_LIMITS["monitor"]
+    tier = _user_tier(current_user)
+    limit = TIER_QUOTA_LIMITS[tier]["monitor"]
 
     # Use the new specific function for the 'monitor' service
     used = await get_usage_for_service(current_user.id, "monitor")
     remaining = max(0, limit - used)
 
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "used": used,
         "remaining": remaining,
         "limit": limit,
@@ -375,106 +501,122 @@ async def handle_chat_completions_endpoint(request: Request, current_user: AuthU
     if not HANDLERS_AVAILABLE:
         raise HTTPException(status_code=503, detail="Backend LLM handlers are not available.")
 
+    # Cheap per-worker flood check before the body is read or Redis is touched
+    if not allow_request_burst(current_user.id):
+        logger.warning("Flood guard rejected request from user: %s", current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please slow down.",
+        )
+
     # Parse Request Data first to determine model
     try:
-        request_data = await request.json()
+        request_data = orjson.loads(await request.body())
         model_name = request_data.get("model")
         if not model_name:
             raise HTTPException(status_code=400, detail="Request body must include a 'model' field.")
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON request body.")
 
-    # --- NEW: Model-based Quota Routing ---
-    # Determine which quota to use based on model type
-    service_type = "agent_creator" if model_name in AGENT_CREATOR_MODELS else "monitor"
-
-    # Check quota for all users (each tier has limits as anti-abuse)
-    if await check_usage(current_user.id, service_type, current_user.is_pro, current_user.is_max, current_user.is_plus):
-        # Determine tier and limit for error message
-        if current_user.is_max:
-            limit_type = "max"
-            limit_value = MAX_QUOTA_LIMITS[service_type]
-        elif current_user.is_plus:
-            limit_type = "plus"
-            limit_value = PLUS_QUOTA_LIMITS[service_type]
-        elif current_user.is_pro:
-            limit_type = "pro"
-            limit_value = PRO_QUOTA_LIMITS[service_type]
-        else:
-            limit_type = "free"
-            limit_value = QUOTA_LIMITS[service_type]
-
-        logger.warning(f"{service_type.capitalize()} limit exceeded for {limit_type} user: {current_user.id} (Daily limit: {limit_value})")
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail={
-                "message": "Rate limit exceeded. Please slow down your requests or try again later.",
-                "quota_type": service_type
-            }
-        )
-
-    # If within limit, increment the appropriate usage counter
-    usage_count = await increment_usage(current_user.id, service_type)
-    user_type = "MAX" if current_user.is_max else ("PLUS" if current_user.is_plus else ("PRO" if current_user.is_pro else "free"))
-    logger.info(f"Processing {service_type} request for {user_type} user: {current_user.id} (Daily {service_type} request #{usage_count})")
-    # --- END of Quota Logic ---
-
     # 5. Find the appropriate handler
-    selected_handler = api_handlers.MODEL_TO_HANDLER.get(model_name)
+    selected_handler, model_info = api_handlers.MODEL_INDEX.get(model_name, (None, None))
 
     if not selected_handler:
-        logger.warning(f"Request for unsupported model: {model_name}")
+        logger.warning("Request for unsupported model: %s", model_name)
         raise HTTPException(status_code=404, detail=f"Model '{model_name}' is not found or supported.")
 
     # 6. Check tier-based access control
-    model_info = next((m for m in selected_handler.get_models() if m["name"] == model_name), None)
     if model_info:
         # Check if model requires max tier
         if model_info.get("max", False) and not current_user.is_max:
-            logger.warning(f"Non-max user {current_user.id} attempted to access max model: {model_name}")
+            logger.warning("Non-max user %s attempted to access max model: %s", current_user.id, model_name)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Model '{model_name}' requires a Max subscription. Please upgrade to access this model."
             )
         # Check if model requires pro tier (or higher)
         elif model_info.get("pro", False) and not (current_user.is_pro or current_user.is_max):
-            logger.warning(f"Free user {current_user.id} attempted to access pro model: {model_name}")
+            logger.warning("Free user %s attempted to access pro model: %s", current_user.id, model_name)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Model '{model_name}' requires a Pro subscription. Please upgrade to access premium models."
             )
 
-    # 7. Execute handler logic with centralized metrics logging
-    
     # Extract prompt info for logging
     messages = request_data.get("messages", [])
     prompt_text = ""
     image_count = 0
     
-    if messages:
-        last_message = messages[-1]
-        content = last_message.get("content")
-        if isinstance(content, str):
-            prompt_text = content
-        elif isinstance(content, list):
-            # Handle multimodal content (text + images)
-            text_parts = []
-            for item in content:
-                if isinstance(item, dict):
-                    if item.get("type") == "text":
-                        text_parts.append(item.get("text", ""))
-                    elif item.get("type") == "image_url":
-                        image_count += 1
-            prompt_text = " ".join(text_parts)
-            if image_count > 0:
-                prompt_text += f" ({image_count} images)"
+    content = messages[-1].get("content") if messages else None
+    if type(content) is str:
+        # Common case: plain text chat
+        prompt_text = content
+    elif isinstance(content, list):
+        # Handle multimodal content (text + images)
+        text_parts = []
+        for item in content:
+            if isinstance(item, dict):
+                item_type = item.get("type")
+                if item_type == "text":
+                    text_parts.append(item.get("text", ""))
+                elif item_type == "image_url":
+                    image_count += 1
+        prompt_text = " ".join(text_parts)
+        if image_count > 0:
+            prompt_text += f" ({image_count} images)"
     
+    # --- NEW: Model-based Quota Routing ---
+    # Determine which quota to use based on model type
+    service_type = "agent_creator" if model_name in AGENT_CREATOR_MODELS else "monitor"
+
+    # Take the handler's concurrency slot before charging quota, so a request
+    # shed by an overloaded upstream doesn't cost the user a credit
+    try:
+        slot = await selected_handler.limiter.acquire()
+    except BackendAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    # Check and consume quota in one atomic step (each tier has limits as anti-abuse)
+    try:
+        usage_count, limited = await increment_and_check(
+            current_user.id, service_type, current_user.is_pro, current_user.is_max, current_user.is_plus
+        )
+    except BaseException:
+        slot.release(adjust=False)
+        raise
+    if limited:
+        slot.release(adjust=False)
+        # Determine tier and limit for error message
+        limit_type = _user_tier(current_user)
+        limit_value = TIER_QUOTA_LIMITS[limit_type][service_type]
+
+        logger.warning("%s limit exceeded for %s user: %s (Daily limit: %s)", service_type.capitalize(), limit_type, current_user.id, limit_value)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "message": "Rate limit exceeded. Please slow down your requests or try again later.",
+                "quota_type": service_type
+            }
+        )
+
+    if logger.isEnabledFor(logging.INFO):
+        user_type = _USER_TYPE_LABELS[_user_tier(current_user)]
+        logger.info("Processing %s request for %s user: %s (Daily %s request #%s)", service_type, user_type, current_user.id, service_type, usage_count)
+    # --- END of Quota Logic ---
+
+    # 7. Execute handler logic with centralized metrics logging
     try:
-        response_payload = await selected_handler.handle_request(request_data)
+        # Bounded by the handler's adaptive limit (slot taken above) so a throttling upstream sheds load early
+        try:
+            response_payload = await selected_handler.handle_request(request_data)
+        except BaseException as e:
+            slot.release(e)
+            raise
 
         # Wrap StreamingResponse with logging (all requests are streaming)
-        if hasattr(response_payload, '__class__') and response_payload.__class__.__name__ == 'StreamingResponse':
-            return StreamingResponse(
+        if isinstance(response_payload, StreamingResponse):
+            # The upstream call runs while the body is iterated, so the stream releases the slot
+            return _SlotStreamingResponse(
                 _log_streaming_response(
                     response_payload.body_iterator,
                     current_user.id,
@@ -482,23 +624,31 @@ async def handle_chat_completions_endpoint(request: Request, current_user: AuthU
                     selected_handler.name,
                     model_name,
                     image_count,
-                    request_data
+                    request_data,
+                    slot=slot
                 ),
                 media_type=response_payload.media_type,
-                headers=response_payload.headers
+                headers=response_payload.headers,
+                slot=slot
             )
+        slot.release()
+
+        # Handlers may hand back an already-rendered body; pass it through untouched
+        if isinstance(response_payload, Response):
+            return response_payload
 
         # Fallback for non-streaming responses (shouldn't happen but defensive)
-        return JSONResponse(content=response_payload)
+        return ORJSONResponse(content=response_payload)
         
     except (HandlerError, ConfigError, BackendAPIError) as e:
         status_code = getattr(e, 'status_code', 500)
+        error_message = str(e)  # Stringified once, shared by the metrics entry and the response
 
         # Log error request metrics
         log_conversation_metrics(
             user_id=current_user.id,
             prompt_text=prompt_text,
-            response_text=f"ERROR: {str(e)}",
+            response_text="ERROR: " + error_message,
             handler=selected_handler.name,
             model=model_name,
             status_code=status_code,
@@ -506,15 +656,15 @@ async def handle_chat_completions_endpoint(request: Request, current_user: AuthU
             request_data=request_data
         )
         
-        logger.error(f"Handler error for model '{model_name}': {e}", exc_info=True)
-        raise HTTPException(status_code=status_code, detail=str(e))
+        logger.error("Handler error for model '%s': %s", model_name, e, exc_info=True)
+        raise HTTPException(status_code=status_code, detail=error_message)
         
     except Exception as e:
         # Log unexpected error metrics
         log_conversation_metrics(
             user_id=current_user.id,
             prompt_text=prompt_text,
-            response_text=f"INTERNAL_ERROR: {str(e)}",
+            response_text=f"INTERNAL_ERROR: {e}",
             handler=selected_handler.name,
             model=model_name,
             status_code=500,
@@ -522,59 +672,51 @@ async def handle_chat_completions_endpoint(request: Request, current_user: AuthU
             request_data=request_data
         )
         
-        logger.exception(f"Unexpected error processing request with handler {selected_handler.name}")
+        logger.exception("Unexpected error processing request with handler %s", selected_handler.name)
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
 
-@compute_router.get("/v1/models", summary="List available models (OpenAI v1 compatible)")
-async def list_models_v1_endpoint():
-    """
-    Provides an OpenAI-compatible /v1/models endpoint.
-
-    This endpoint returns a list of available models in a standardized format,
-    while also including custom 'parameter_size' and 'multimodal' fields
-    that the Observer AI frontend uses for a richer UI.
-    """
-    if not HANDLERS_AVAILABLE:
-        raise HTTPException(status_code=503, detail="Backend handlers are not available.")
+# Serialized /v1/models body, rebuilt only when api_handlers re-indexes its models
+_v1_models_body = None
+_v1_models_version = None
 
-    # Exclude agent creator models and other hidden models from public listing
-    EXCLUDED = AGENT_CREATOR_MODELS | {"gemini-2.5-pro"}
-    
+def _build_v1_models_body() -> bytes:
+    """Render the /v1/models catalog to JSON bytes."""
     # This list will hold the model data in the new format.
     model_data_list = []
 
     if api_handlers and api_handlers.API_HANDLERS:
         for handler in api_handlers.API_HANDLERS.values():
             try:
-                for model_info in handler.get_models():
-                    name = model_info.get("name", "")
-                    if name in EXCLUDED:
-                        continue
-                    
-                    # Create the new model entry in the OpenAI-compatible format
-                    new_model_entry = {
-                        "id": name, # The standard uses 'id' for the model name
-                        "object": "model",
-                        "created": 0, # Placeholder, as it's not strictly needed by the UI
-                        "owned_by": handler.name,
-
-                        # --- Custom fields needed by the Observer frontend ---
-                        "parameter_size": model_info.get("parameters", "N/A"),
-                        "multimodal": model_info.get("multimodal", False),
-                        "pro": model_info.get("pro", False)
-                    }
-                    model_data_list.append(new_model_entry)
-
+                # Entries are prebuilt per handler; only the visibility filter runs here
+                model_data_list.extend(
+                    entry for entry in handler.get_v1_model_entries() if entry["id"] not in V1_MODELS_EXCLUDED
+                )
             except Exception as e:
-                logger.error(f"Failed to get v1/models from handler {handler.name}: {e}")
+                logger.error("Failed to get v1/models from handler %s: %s", handler.name, e)
     else:
         logger.warning("/v1/models called but no handlers are loaded.")
 
     # The final response must be a dictionary with 'object' and 'data' keys
-    return JSONResponse(content={
+    return orjson.dumps({
         "object": "list",
         "data": model_data_list
     })
 
+@compute_router.get("/v1/models", summary="List available models (OpenAI v1 compatible)")
+async def list_models_v1_endpoint():
+    """
+    Provides an OpenAI-compatible /v1/models endpoint.
+
+    This endpoint returns a list of available models in a standardized format,
+    while also including custom 'parameter_size' and 'multimodal' fields
+    that the Observer AI frontend uses for a richer UI.
+    """
+    global _v1_models_body, _v1_models_version
+    if not HANDLERS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Backend handlers are not available.")
 
+    if _v1_models_body is None or _v1_models_version != api_handlers.MODEL_INDEX_VERSION:
+        _v1_models_version = api_handlers.MODEL_INDEX_VERSION
+        _v1_models_body = _build_v1_models_body()
+    return Response(content=_v1_models_body, media_type="application/json")
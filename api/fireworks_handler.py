@@ -1,15 +1,29 @@
 #!/usr/bin/env python3
 import os
-import json
 import logging
+import orjson
 import httpx  # Use httpx for async requests
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 
 # Import base class and custom exceptions
-from api_handlers import BaseAPIHandler, ConfigError, BackendAPIError, HandlerError, get_http_client
+from api_handlers import (
+    BaseAPIHandler, ConfigError, BackendAPIError, HandlerError, get_http_client,
+    aiter_sse_lines, model_field_rewrite, rewrite_model_field, rewrite_sse_chunk,
+)
 
 logger = logging.getLogger("fireworks_handler")
 
+# Sampling defaults from the Fireworks curl example, used when the client doesn't set them
+FIREWORKS_DEFAULT_PARAMS = {
+    "max_tokens": 16384,
+    "top_p": 1,
+    "top_k": 40,
+    "presence_penalty": 0,
+    "frequency_penalty": 0,
+    "temperature": 0.6,
+}
+
+
 class FireworksAPIHandler(BaseAPIHandler):
     """
     Asynchronous handler for Fireworks AI API requests using httpx,
@@ -52,6 +66,12 @@ class FireworksAPIHandler(BaseAPIHandler):
             "multimodal": model_info.get("multimodal", False), "pro": True}
             for display_name, model_info in self.model_map.items()
         ]
+        # Precompiled per display name, used to rewrite the model field without re-parsing responses
+        self._model_field_rewrites = {
+            display_name: model_field_rewrite(model_info["model_id"], display_name)
+            for display_name, model_info in self.model_map.items()
+            if model_info.get("model_id")
+        }
         # --- End Model Mapping ---
 
         self.api_key = os.environ.get("FIREWORKS_API_KEY")
@@ -72,7 +92,7 @@ class FireworksAPIHandler(BaseAPIHandler):
         """
         Process a /v1/chat/completions request asynchronously via Fireworks AI.
         Translates display model name to actual Fireworks model ID.
-        Returns either dict (non-streaming) or StreamingResponse (streaming).
+        Returns either a JSON Response (non-streaming) or StreamingResponse (streaming).
         """
         if not self.api_key:
             raise ConfigError("FIREWORKS_API_KEY is not configured on the server.")
@@ -97,24 +117,8 @@ class FireworksAPIHandler(BaseAPIHandler):
         # --- End Translation ---
 
         # --- Prepare API Call ---
-        # Create a copy of the request data to modify
-        payload = request_data.copy()
-        # Set the 'model' in the payload to the ACTUAL Fireworks ID
-        payload["model"] = actual_model_id
-
-        # Default values from the curl example
-        if "max_tokens" not in payload:
-            payload["max_tokens"] = 16384
-        if "top_p" not in payload:
-            payload["top_p"] = 1
-        if "top_k" not in payload:
-            payload["top_k"] = 40
-        if "presence_penalty" not in payload:
-            payload["presence_penalty"] = 0
-        if "frequency_penalty" not in payload:
-            payload["frequency_penalty"] = 0
-        if "temperature" not in payload:
-            payload["temperature"] = 0.6
+        # Defaults first, then the client's values, with 'model' set to the ACTUAL Fireworks ID
+        payload = {**FIREWORKS_DEFAULT_PARAMS, **request_data, "model": actual_model_id}
 
         # Update headers (in case API key was missing during init)
         headers = self.base_headers.copy()
@@ -132,9 +136,8 @@ class FireworksAPIHandler(BaseAPIHandler):
         # --- Make Non-Streaming API Call using httpx ---
         try:
             client = get_http_client()
-            response = await client.post(self.FIREWORKS_API_URL, headers=headers, json=payload)
+            response = await client.post(self.FIREWORKS_API_URL, headers=headers, content=orjson.dumps(payload))
             response.raise_for_status()
-            response_data = response.json()
 
         # --- Error Handling ---
         except httpx.RequestError as exc:
@@ -145,67 +148,53 @@ class FireworksAPIHandler(BaseAPIHandler):
             status_code = exc.response.status_code
             logger.error(f"Fireworks API returned error {status_code} for model {actual_model_id}: {error_body[:500]}")
             try:
-                error_json = exc.response.json()
+                error_json = orjson.loads(exc.response.content)
                 message = error_json.get("error", {}).get("message", error_body)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 message = error_body
             raise BackendAPIError(f"Fireworks API Error ({status_code}): {message}", status_code=status_code) from exc
         except Exception as exc:
             logger.exception(f"An unexpected error occurred during Fireworks API call for model {actual_model_id}")
             raise HandlerError(f"Unexpected error processing Fireworks request: {exc}") from exc
 
-        # --- Log Conversation (using display name for consistency) ---
-        prompt_text = ""
-        response_text = ""
-        try:
-            messages = request_data.get("messages", [])
-            if messages and isinstance(messages[-1].get("content"), str):
-                prompt_text = messages[-1].get("content", "")[:500]
-            if 'choices' in response_data and response_data['choices']:
-                choice = response_data['choices'][0]
-                if 'message' in choice and 'content' in choice['message']:
-                    response_text = choice['message']['content'][:500]
-        except Exception as log_parse_err:
-            logger.warning(f"Could not parse prompt/response for logging: {log_parse_err}")
-
         # --- Conversation logging now handled centrally in compute.py ---
 
         # --- Return Response ---
-        # Replace actual ID with display name in response
-        if "model" in response_data:
-            response_data["model"] = display_model_name
+        # Upstream bytes are passed through untouched apart from showing the *display name*
+        # in the top-level model field; only parsed when upstream reports some other id
+        body = rewrite_model_field(response.content, self._model_field_rewrites[display_model_name], display_model_name)
 
-        logger.info(f"Successfully processed Fireworks request for display model '{display_model_name}'.")
-        return response_data
+        logger.info("Successfully processed Fireworks request for display model '%s'.", display_model_name)
+        return Response(content=body, media_type="application/json")
 
     async def _stream_fireworks_response(self, headers: dict, payload: dict, display_model_name: str, actual_model_id: str):
         """Stream SSE chunks from Fireworks API."""
+        rewrite = self._model_field_rewrites[display_model_name]
         try:
             client = get_http_client()
-            async with client.stream("POST", self.FIREWORKS_API_URL, headers=headers, json=payload) as response:
+            async with client.stream("POST", self.FIREWORKS_API_URL, headers=headers, content=orjson.dumps(payload)) as response:
+                if response.is_error:
+                    await response.aread()  # So the status handler below can read the body
                 response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
+                async for line in aiter_sse_lines(response):
+                    if line.startswith(b"data: "):
                         # Replace actual model ID with display name in streaming chunks
                         chunk_data = line[6:]  # Remove "data: " prefix
-                        if chunk_data != "[DONE]":
-                            try:
-                                chunk_json = json.loads(chunk_data)
-                                if "model" in chunk_json:
-                                    chunk_json["model"] = display_model_name
-                                yield f"data: {json.dumps(chunk_json)}\n\n"
-                            except json.JSONDecodeError:
-                                # If we can't parse, just forward as-is
-                                yield f"data: {chunk_data}\n\n"
+                        if chunk_data != b"[DONE]":
+                            yield rewrite_sse_chunk(chunk_data, rewrite, display_model_name)
                         else:
-                            yield f"data: {chunk_data}\n\n"
+                            yield b"data: [DONE]\n\n"
         except httpx.RequestError as exc:
             logger.error(f"Fireworks streaming API request failed: {exc}")
-            yield f"data: {json.dumps({'error': f'Connection error: {exc}'})}\n\n"
+            # The error frame tells the client; raising after it tells compute.py (metrics, limiter back-off)
+            yield b"data: " + orjson.dumps({'error': f'Connection error: {exc}'}) + b"\n\n"
+            raise BackendAPIError(f"Could not connect to Fireworks API: {exc}", status_code=503) from exc
         except httpx.HTTPStatusError as exc:
             error_body = exc.response.text
             logger.error(f"Fireworks streaming API error {exc.response.status_code}: {error_body[:500]}")
-            yield f"data: {json.dumps({'error': f'API error ({exc.response.status_code}): {error_body}'})}\n\n"
+            yield b"data: " + orjson.dumps({'error': f'API error ({exc.response.status_code}): {error_body}'}) + b"\n\n"
+            raise BackendAPIError(f"Fireworks API Error ({exc.response.status_code}): {error_body}", status_code=exc.response.status_code) from exc
         except Exception as exc:
             logger.exception(f"Unexpected error in Fireworks streaming for model {actual_model_id}")
-            yield f"data: {json.dumps({'error': f'Unexpected error: {exc}'})}\n\n"
+            yield b"data: " + orjson.dumps({'error': f'Unexpected error: {exc}'}) + b"\n\n"
+            raise HandlerError(f"Unexpected error in Fireworks stream: {exc}") from exc
@@ -1,30 +1,152 @@
 #!/usr/bin/env python3
+import asyncio
 import os
-import json
 import time
 import re
 import base64
+import binascii
+import random
 import secrets
 import logging
+import orjson
 import httpx # Use httpx for async requests
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 
 # Import base class and custom exceptions
-from api_handlers import BaseAPIHandler, ConfigError, BackendAPIError, HandlerError, get_http_client
+from api_handlers import BaseAPIHandler, ConfigError, BackendAPIError, HandlerError, get_http_client, aiter_sse_lines
 
 logger = logging.getLogger("gemini_handler")
 # Assuming logging is configured elsewhere (e.g., in main FastAPI app)
 
+# Matches an image data URI and captures (mime_type, base64_payload) in one pass
+_DATA_URI_RE = re.compile(r"data:(image/[a-zA-Z+.-]+);base64,(.*)", re.DOTALL)
+
+# ASCII whitespace that may wrap a base64 payload
+_B64_WHITESPACE_RE = re.compile(r"[\t\n\v\f\r ]+")
+
+# Gemini rejects inline requests above 20MB, so refuse larger images before calling upstream
+_MAX_INLINE_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Completion ids are correlation ids, not security tokens: a PRNG seeded once from the
+# OS CSPRNG avoids a urandom syscall per response
+_ID_RNG = random.Random(secrets.token_bytes(32))
+
+
+def _new_completion_id(prefix: str) -> str:
+    return f"{prefix}{_ID_RNG.getrandbits(96):024x}"
+
+
+# Gemini finishReason -> OpenAI finish_reason (stop, length, content_filter, tool_calls, function_call)
+_FINISH_REASONS = {
+    "STOP": "stop",
+    "UNSPECIFIED": "stop",
+    "MAX_TOKENS": "length",
+    "SAFETY": "content_filter",
+}
+
+# Optional lazy JSON parser for large generateContent replies
+try:
+    import simdjson
+    _SIMDJSON_PARSER = simdjson.Parser()
+except ImportError:
+    simdjson = None
+    _SIMDJSON_PARSER = None
+
+
+def _load_gemini_response(body: bytes) -> dict:
+    """
+    Parse a generateContent reply, materializing only the fields the handler reads.
+
+    With pysimdjson the document is parsed lazily and only the first candidate,
+    promptFeedback and usageMetadata are copied into plain Python objects. The
+    parser is reused between calls, so nothing it returns may escape this function.
+    Falls back to a full orjson parse when simdjson is not installed.
+    """
+    if _SIMDJSON_PARSER is None:
+        return orjson.loads(body)
+
+    doc = _SIMDJSON_PARSER.parse(body)
+    if not isinstance(doc, simdjson.Object):
+        return {}
+
+    result = {}
+    candidates = doc.get("candidates")
+    if isinstance(candidates, simdjson.Array) and len(candidates) and isinstance(candidates[0], simdjson.Object):
+        result["candidates"] = [candidates[0].as_dict()]
+    for key in ("promptFeedback", "usageMetadata"):
+        value = doc.get(key)
+        if isinstance(value, simdjson.Object):
+            result[key] = value.as_dict()
+    return result
+
+
+def _validate_image_data(base64_data: str) -> str:
+    """
+    Reject oversized or malformed base64 image payloads before they reach Gemini,
+    and return the payload to forward.
+
+    Line breaks and other ASCII whitespace (MIME-wrapped base64) are stripped first,
+    as Gemini itself ignores them. The size check works from the encoded length, so
+    huge uploads are refused without decoding them.
+    """
+    base64_data = _B64_WHITESPACE_RE.sub("", base64_data)
+    padding = base64_data.count("=", -2)
+    decoded_size = len(base64_data) * 3 // 4 - padding
+    if decoded_size > _MAX_INLINE_IMAGE_BYTES:
+        raise HandlerError(
+            f"Image is too large ({decoded_size} bytes, limit {_MAX_INLINE_IMAGE_BYTES}).",
+            status_code=413
+        )
+    try:
+        base64.b64decode(base64_data, validate=True)
+    except binascii.Error as exc:
+        raise HandlerError(f"Invalid base64 image data: {exc}", status_code=400) from exc
+    return base64_data
+
+
+def _parse_content_list(content: list, parts_out: list) -> int:
+    """
+    Convert a list of OpenAI content items (text/image_url) into Gemini parts.
+
+    Appends to parts_out and returns the number of images found. Kept as a flat
+    module-level function with locals bound up-front since it runs once per item
+    of every multimodal message.
+    """
+    append = parts_out.append
+    match_data_uri = _DATA_URI_RE.match
+    image_count = 0
+    for item in content:
+        if not isinstance(item, dict):
+            continue
+        item_type = item.get("type")
+        if item_type == "text":
+            text = item.get("text", "").strip()
+            if text:
+                append({"text": text})
+        elif item_type == "image_url":
+            image_url_data = item.get("image_url")
+            if isinstance(image_url_data, dict) and "url" in image_url_data:
+                data_uri = match_data_uri(image_url_data["url"])
+                if data_uri:
+                    mime_type, base64_data = data_uri.groups()
+                    append({"inline_data": {"mime_type": mime_type, "data": _validate_image_data(base64_data)}})
+                    image_count += 1
+    return image_count
+
+
 class GeminiAPIHandler(BaseAPIHandler):
     """
     Asynchronous handler for Google Gemini API requests using httpx.
+    Variants for other keys/tiers subclass this and pass their own name, key and model map.
     """
-    def __init__(self):
-        super().__init__("gemini")
-        
+    def __init__(self, name="gemini", api_key_env="GEMINI_API_KEY", model_map=None):
+        super().__init__(name)
+        self.api_key_env = api_key_env
+        self.id_prefix = f"{name}-chatcmpl-"
+
         # --- Model Mapping (like OpenRouter) ---
         # Maps display names to actual Gemini model IDs
-        self.model_map = {
+        self.model_map = model_map if model_map is not None else {
             "gemma-4-26b-a4b-it": {
                 "model_id": "gemma-4-26b-a4b-it",
                 "parameters": "26BA4",
@@ -93,96 +215,89 @@ class GeminiAPIHandler(BaseAPIHandler):
             }
             for display_name, model_info in self.model_map.items()
         ]
-        self.api_key = os.environ.get("GEMINI_API_KEY")
+        self.api_key = os.environ.get(api_key_env)
         if not self.api_key:
-            logger.error("GEMINI_API_KEY environment variable not set. Gemini handler will fail.")
+            logger.error("%s environment variable not set. %s handler will fail.", api_key_env, name)
             # Don't raise here, let handle_request fail clearly if called
+        # Same for every call (the shared HTTP client carries the connection pool)
+        self.headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.api_key or "",
+            "User-Agent": "ObserverAI-FastAPI-Client/1.0"
+        }
 
-        logger.info("GeminiAPIHandler registered models: %s", [m["name"] for m in self.models])
+        logger.info("%s registered models: %s", type(self).__name__, [m["name"] for m in self.models])
 
     async def handle_request(self, request_data: dict):
         """
         Process a /v1/chat/completions request asynchronously for Gemini models.
-        Returns either dict (non-streaming) or StreamingResponse (streaming).
+        Returns either Response (non-streaming, orjson-encoded) or StreamingResponse (streaming).
         """
         if not self.api_key:
-             raise ConfigError("GEMINI_API_KEY is not configured on the server.")
+             raise ConfigError(f"{self.api_key_env} is not configured on the server.")
 
         # --- Request Data Validation and Processing ---
         model_name = request_data.get("model")
         if not model_name:
              raise ValueError("Request data must include a 'model' field.")
 
-        # Map display name to actual Gemini model ID
-        if model_name in self.model_map:
-            target_model = self.model_map[model_name]["model_id"]
-        else:
-            target_model = model_name  # Fallback to direct name
+        # Map display name to actual Gemini model ID (single hash lookup)
+        model_entry = self.model_map.get(model_name)
+        target_model = model_entry["model_id"] if model_entry else model_name  # Fallback to direct name
 
         messages = request_data.get("messages", [])
         if not messages:
             raise ValueError("Request body must contain a 'messages' array")
 
+        # --- Convert OpenAI format messages to Gemini format ---
+        # Done before streaming starts so invalid images are rejected with a proper status code.
+        # Multimodal messages get every image base64-checked, which can take a while for
+        # large screenshots, so that case runs in a worker thread instead of the event loop.
+        if any(isinstance(msg.get("content"), list) for msg in messages):
+            system_instruction, contents = await asyncio.to_thread(self._convert_messages_to_gemini_format, messages)
+        else:
+            system_instruction, contents = self._convert_messages_to_gemini_format(messages)
+
+        if not contents:
+            raise ValueError("No valid content found to send to Gemini.")
+
         # Check for streaming
         if request_data.get("stream", False):
             return StreamingResponse(
-                self._stream_gemini_response(request_data, target_model),
+                self._stream_gemini_response(request_data, target_model, system_instruction, contents),
                 media_type="text/event-stream"
             )
 
-        # --- Convert OpenAI format messages to Gemini format ---
-        system_instruction, contents = self._convert_messages_to_gemini_format(messages)
-
-        if not contents:
-            raise ValueError("No valid content found to send to Gemini.")
-
         # --- Prepare Gemini API Call ---
         gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{target_model}:generateContent"
 
-        # Build payload with converted contents
-        payload = {"contents": contents}
-
-        # Add system_instruction if present
-        if system_instruction:
-            payload["system_instruction"] = system_instruction
-
-        # Add generationConfig if needed from request_data (temperature, max_tokens etc.)
-        generation_config = {}
-        if "temperature" in request_data: generation_config["temperature"] = request_data["temperature"]
-        if "max_tokens" in request_data: generation_config["maxOutputTokens"] = request_data["max_tokens"]
-        if generation_config: payload["generationConfig"] = generation_config
-
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": self.api_key,
-            "User-Agent": "ObserverAI-FastAPI-Client/1.0"
-        }
+        payload = self._build_payload(request_data, system_instruction, contents)
 
-        logger.info(f"Calling Gemini API: model={target_model}, messages={len(contents)}, system_instruction={system_instruction is not None}")
+        logger.info("Calling Gemini API: model=%s, messages=%d, system_instruction=%s", target_model, len(contents), system_instruction is not None)
 
         # --- Make API Call using httpx ---
         try:
             client = get_http_client()
-            response = await client.post(gemini_url, headers=headers, json=payload)
+            response = await client.post(gemini_url, headers=self.headers, content=orjson.dumps(payload))
             response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx responses
-            response_data = response.json()
+            response_data = _load_gemini_response(response.content)
 
         except httpx.RequestError as exc:
-            logger.error(f"Gemini API request failed (network/connection): {exc}")
+            logger.error("Gemini API request failed (network/connection): %s", exc)
             raise BackendAPIError(f"Could not connect to Gemini API: {exc}", status_code=503) from exc # 503 Service Unavailable
         except httpx.HTTPStatusError as exc:
             error_body = exc.response.text
             status_code = exc.response.status_code
-            logger.error(f"Gemini API returned error {status_code}: {error_body[:500]}")
+            logger.error("Gemini API returned error %s: %s", status_code, error_body[:500])
             # Try to parse Gemini error message
             try:
-                error_json = exc.response.json()
+                error_json = orjson.loads(exc.response.content)
                 message = error_json.get("error", {}).get("message", error_body)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 message = error_body
             raise BackendAPIError(f"Gemini API Error ({status_code}): {message}", status_code=status_code) from exc
         except Exception as exc:
-            logger.exception(f"An unexpected error occurred during Gemini API call for model {target_model}")
+            logger.exception("An unexpected error occurred during Gemini API call for model %s", target_model)
             raise HandlerError(f"Unexpected error processing Gemini request: {exc}") from exc
 
 
@@ -192,44 +307,41 @@ class GeminiAPIHandler(BaseAPIHandler):
         finish_reason = "stop" # Default
 
         try:
-            # Safer access to potentially missing keys
-            candidates = response_data.get("candidates", [])
+            # Safer access to potentially missing keys (no throwaway {} / [] defaults)
+            candidates = response_data.get("candidates")
             if candidates:
                  candidate = candidates[0]
-                 content = candidate.get("content", {})
-                 parts = content.get("parts", [])
+                 content = candidate.get("content")
+                 parts = content.get("parts") if content else None
                  if parts:
+                      # Collected and joined once rather than concatenated part by part
+                      text_parts = []
+                      reasoning_parts = []
                       for part in parts:
-                          if part.get("thought", False):
-                              reasoning_text += part.get("text", "")
-                          else:
-                              generated_text += part.get("text", "")
-                      generated_text = generated_text.strip()
-                      reasoning_text = reasoning_text.strip()
+                          if "text" in part:
+                              (reasoning_parts if part.get("thought", False) else text_parts).append(part["text"])
+                      generated_text = "".join(text_parts).strip()
+                      reasoning_text = "".join(reasoning_parts).strip()
 
                  # Map finish reason
                  finish_reason_gemini = candidate.get("finishReason", "STOP").upper()
-                 # OpenAI reasons: stop, length, content_filter, tool_calls, function_call
-                 if finish_reason_gemini == "MAX_TOKENS":
-                      finish_reason = "length"
-                 elif finish_reason_gemini == "SAFETY":
-                      finish_reason = "content_filter"
-                 elif finish_reason_gemini not in ["STOP", "UNSPECIFIED"]:
+                 finish_reason = _FINISH_REASONS.get(finish_reason_gemini)
+                 if finish_reason is None:
                       # Keep other reasons like RECITATION, etc. or map them if needed
                       finish_reason = finish_reason_gemini.lower()
-                      logger.warning(f"Unhandled Gemini finish reason: {finish_reason_gemini}")
+                      logger.warning("Unhandled Gemini finish reason: %s", finish_reason_gemini)
             else:
                  logger.warning("Gemini response did not contain candidates.")
                  # Check for promptFeedback for blocked prompts
                  prompt_feedback = response_data.get("promptFeedback")
                  if prompt_feedback and prompt_feedback.get("blockReason"):
                       block_reason = prompt_feedback.get("blockReason")
-                      logger.error(f"Gemini request blocked. Reason: {block_reason}")
+                      logger.error("Gemini request blocked. Reason: %s", block_reason)
                       generated_text = f"[Request blocked due to: {block_reason}]"
                       finish_reason = "content_filter" # Treat blocked prompt as content filter finish
 
         except (AttributeError, KeyError, IndexError, TypeError) as e:
-            logger.error(f"Error parsing Gemini response structure: {e}", exc_info=True)
+            logger.error("Error parsing Gemini response structure: %s", e, exc_info=True)
             generated_text = "[Error parsing Gemini response]"
             # Keep finish_reason as 'stop' or set to an error state?
 
@@ -237,7 +349,7 @@ class GeminiAPIHandler(BaseAPIHandler):
 
         # --- Format Response (OpenAI Style) ---
         openai_response = {
-            "id": "gemini-chatcmpl-" + secrets.token_hex(12),
+            "id": _new_completion_id(self.id_prefix),
             "object": "chat.completion",
             "created": int(time.time()),
             "model": target_model, # Return the model actually used
@@ -257,75 +369,79 @@ class GeminiAPIHandler(BaseAPIHandler):
             # Add system_fingerprint if available/needed
         }
 
-        logger.info(f"Successfully processed Gemini request for {target_model}. Response length: {len(generated_text)}")
-        return openai_response
+        logger.info("Successfully processed Gemini request for %s. Response length: %d", target_model, len(generated_text))
+        # Serialized once here with orjson rather than re-encoded by JSONResponse in compute.py
+        return Response(orjson.dumps(openai_response), media_type="application/json")
 
-    async def _stream_gemini_response(self, request_data: dict, target_model: str):
-        """Stream Gemini API response and convert to OpenAI SSE format."""
-        # Convert messages to Gemini format
-        messages = request_data.get("messages", [])
-        system_instruction, contents = self._convert_messages_to_gemini_format(messages)
-
-        # Prepare Gemini API call
-        gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{target_model}:streamGenerateContent?alt=sse"
+    def _build_payload(self, request_data: dict, system_instruction, contents: list) -> dict:
+        """Build the generateContent / streamGenerateContent request body."""
+        # Build payload with converted contents
         payload = {"contents": contents}
 
         # Add system_instruction if present
         if system_instruction:
             payload["system_instruction"] = system_instruction
 
-        # Add generationConfig if needed
+        # Add generationConfig if needed from request_data (temperature, max_tokens etc.)
         generation_config = {}
         if "temperature" in request_data: generation_config["temperature"] = request_data["temperature"]
         if "max_tokens" in request_data: generation_config["maxOutputTokens"] = request_data["max_tokens"]
         if generation_config: payload["generationConfig"] = generation_config
+        return payload
 
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": self.api_key,
-            "User-Agent": "ObserverAI-FastAPI-Client/1.0"
-        }
+    async def _stream_gemini_response(self, request_data: dict, target_model: str, system_instruction, contents: list):
+        """Stream Gemini API response and convert to OpenAI SSE format."""
+        # Prepare Gemini API call
+        gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{target_model}:streamGenerateContent?alt=sse"
+        payload = self._build_payload(request_data, system_instruction, contents)
 
-        logger.info(f"Streaming Gemini API: model={target_model}, messages={len(contents)}, system_instruction={system_instruction is not None}")
+        logger.info("Streaming Gemini API: model=%s, messages=%d, system_instruction=%s", target_model, len(contents), system_instruction is not None)
 
         try:
             client = get_http_client()
-            async with client.stream("POST", gemini_url, headers=headers, json=payload) as response:
+            async with client.stream("POST", gemini_url, headers=self.headers, content=orjson.dumps(payload)) as response:
+                if response.is_error:
+                    await response.aread()  # So the status handler below can read the body
                 response.raise_for_status()
 
-                chunk_id = "gemini-chatcmpl-" + secrets.token_hex(12)
+                chunk_id = _new_completion_id(self.id_prefix)
+                created = int(time.time())  # One timestamp for the whole completion, as OpenAI does
                 chunk_index = 0
 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
+                async for line in aiter_sse_lines(response):
+                    if line.startswith(b"data: "):
                         chunk_data = line[6:]  # Remove "data: " prefix
                         if chunk_data.strip():
                             try:
-                                gemini_chunk = json.loads(chunk_data)
+                                gemini_chunk = orjson.loads(chunk_data)
                                 # Convert Gemini chunk to OpenAI format
                                 openai_chunk = self._convert_gemini_chunk_to_openai(
-                                    gemini_chunk, chunk_id, chunk_index, target_model
+                                    gemini_chunk, chunk_id, created, chunk_index, target_model
                                 )
                                 if openai_chunk:
-                                    yield f"data: {json.dumps(openai_chunk)}\n\n"
+                                    yield b"data: " + orjson.dumps(openai_chunk) + b"\n\n"
                                     chunk_index += 1
-                            except json.JSONDecodeError:
+                            except orjson.JSONDecodeError:
                                 # Skip invalid JSON chunks
                                 continue
 
                 # Send [DONE] when finished
-                yield f"data: [DONE]\n\n"
+                yield b"data: [DONE]\n\n"
 
         except httpx.RequestError as exc:
-            logger.error(f"Gemini streaming API request failed: {exc}")
-            yield f"data: {json.dumps({'error': f'Connection error: {exc}'})}\n\n"
+            logger.error("Gemini streaming API request failed: %s", exc)
+            # The error frame tells the client; raising after it tells compute.py (metrics, limiter back-off)
+            yield b"data: " + orjson.dumps({'error': f'Connection error: {exc}'}) + b"\n\n"
+            raise BackendAPIError(f"Could not connect to Gemini API: {exc}", status_code=503) from exc
         except httpx.HTTPStatusError as exc:
             error_body = exc.response.text
-            logger.error(f"Gemini streaming API error {exc.response.status_code}: {error_body[:500]}")
-            yield f"data: {json.dumps({'error': f'API error ({exc.response.status_code}): {error_body}'})}\n\n"
+            logger.error("Gemini streaming API error %s: %s", exc.response.status_code, error_body[:500])
+            yield b"data: " + orjson.dumps({'error': f'API error ({exc.response.status_code}): {error_body}'}) + b"\n\n"
+            raise BackendAPIError(f"Gemini API Error ({exc.response.status_code}): {error_body}", status_code=exc.response.status_code) from exc
         except Exception as exc:
-            logger.exception(f"Unexpected error in Gemini streaming for model {target_model}")
-            yield f"data: {json.dumps({'error': f'Unexpected error: {exc}'})}\n\n"
+            logger.exception("Unexpected error in Gemini streaming for model %s", target_model)
+            yield b"data: " + orjson.dumps({'error': f'Unexpected error: {exc}'}) + b"\n\n"
+            raise HandlerError(f"Unexpected error in Gemini stream: {exc}") from exc
 
     def _convert_messages_to_gemini_format(self, messages: list):
         """
@@ -393,86 +509,53 @@ class GeminiAPIHandler(BaseAPIHandler):
                 gemini_parts.append({"text": text})
                 combined_text_prompt = text
         elif isinstance(content, list):
-            text_parts_log = []
-            for item in content:
-                if not isinstance(item, dict): continue
-                item_type = item.get("type")
-                if item_type == "text":
-                    text = item.get("text", "").strip()
-                    if text:
-                        gemini_parts.append({"text": text})
-                        text_parts_log.append(text)
-                elif item_type == "image_url":
-                    image_url_data = item.get("image_url")
-                    if isinstance(image_url_data, dict) and "url" in image_url_data:
-                        url = image_url_data["url"]
-                        if url.startswith("data:"):
-                            try:
-                                header, base64_data = url.split(",", 1)
-                                mime_match = re.match(r"data:(image\/[a-zA-Z+.-]+);base64", header)
-                                if mime_match:
-                                    mime_type = mime_match.group(1)
-                                    gemini_parts.append({
-                                        "inline_data": {"mime_type": mime_type, "data": base64_data}
-                                    })
-                                    image_count += 1
-                            except Exception as e:
-                                logger.error(f"Error processing data URI image: {e}")
-            combined_text_prompt = " ".join(text_parts_log) + f" ({image_count} images)" if image_count else " ".join(text_parts_log)
+            image_count = _parse_content_list(content, gemini_parts)
+            # Text parts are already collected in gemini_parts; join them once here
+            combined_text_prompt = " ".join([part["text"] for part in gemini_parts if "text" in part])
+            if image_count:
+                combined_text_prompt += f" ({image_count} images)"
         
         return gemini_parts, combined_text_prompt, image_count
 
-    def _convert_gemini_chunk_to_openai(self, gemini_chunk: dict, chunk_id: str, index: int, model: str):
+    def _convert_gemini_chunk_to_openai(self, gemini_chunk: dict, chunk_id: str, created: int, index: int, model: str):
         """Convert a Gemini streaming chunk to OpenAI format."""
-        candidates = gemini_chunk.get("candidates", [])
+        candidates = gemini_chunk.get("candidates")
         if not candidates:
             return None
-            
+
         candidate = candidates[0]
-        content = candidate.get("content", {})
-        parts = content.get("parts", [])
-        
+        content = candidate.get("content")
+        parts = (content.get("parts") if content else None) or ()
+
         # Route thought parts to reasoning, regular parts to content (mirrors Ollama)
-        text_content = ""
-        reasoning_content = ""
+        text_parts = []
+        reasoning_parts = []
         for part in parts:
             if "text" in part:
-                if part.get("thought", False):
-                    reasoning_content += part["text"]
-                else:
-                    text_content += part["text"]
+                (reasoning_parts if part.get("thought", False) else text_parts).append(part["text"])
+        text_content = "".join(text_parts)
+        reasoning_content = "".join(reasoning_parts)
 
         # Check for finish reason
-        finish_reason = None
         finish_reason_gemini = candidate.get("finishReason")
-        if finish_reason_gemini:
-            if finish_reason_gemini == "MAX_TOKENS":
-                finish_reason = "length"
-            elif finish_reason_gemini == "SAFETY":
-                finish_reason = "content_filter"
-            else:
-                finish_reason = "stop"
+        finish_reason = _FINISH_REASONS.get(finish_reason_gemini, "stop") if finish_reason_gemini else None
 
-        # Build OpenAI chunk
-        openai_chunk = {
-            "id": chunk_id,
-            "object": "chat.completion.chunk",
-            "created": int(time.time()),
-            "model": model,
-            "choices": [{
-                "index": 0,
-                "delta": {}
-            }]
-        }
+        # Nothing to tell the client (e.g. a usage-only chunk): don't emit an empty frame
+        if not (text_content or reasoning_content or finish_reason):
+            return None
 
-        # Add content/reasoning if present (matches Ollama delta.reasoning / delta.content pattern)
-        if text_content:
-            openai_chunk["choices"][0]["delta"]["content"] = text_content
+        # Delta carries content/reasoning only if present (matches Ollama delta.reasoning / delta.content pattern)
+        delta = {"content": text_content} if text_content else {}
         if reasoning_content:
-            openai_chunk["choices"][0]["delta"]["reasoning"] = reasoning_content
-
-        # Add finish reason if present
+            delta["reasoning"] = reasoning_content
+        choice = {"index": 0, "delta": delta}
         if finish_reason:
-            openai_chunk["choices"][0]["finish_reason"] = finish_reason
+            choice["finish_reason"] = finish_reason
 
-        return openai_chunk
+        return {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [choice],
+        }
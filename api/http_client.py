@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import logging
+import httpx
+from typing import Optional
+
+logger = logging.getLogger("http_client")
+
+# Shared HTTP client - one connection pool for the process lifetime.
+# Kept free of local imports so any module can use it without loading the LLM handlers.
+_shared_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client. Requires startup_http_client() to have run."""
+    if _shared_http_client is None:
+        raise RuntimeError("Shared HTTP client not initialized.")
+    return _shared_http_client
+
+async def startup_http_client():
+    """Create the shared HTTP client. Called from FastAPI lifespan on startup."""
+    global _shared_http_client
+    _shared_http_client = httpx.AsyncClient(
+        http2=True, # Multiplex concurrent calls to the same upstream over one connection
+        timeout=120.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    logger.info("Shared HTTP client initialized")
+
+async def shutdown_http_client():
+    """Close the shared HTTP client. Called from FastAPI lifespan on shutdown."""
+    global _shared_http_client
+    if _shared_http_client:
+        await _shared_http_client.aclose()
+        _shared_http_client = None
+        logger.info("Shared HTTP client closed")
@@ -1,6 +1,15 @@
 import logging
 import sys
-from python_json_logger import jsonlogger
+import orjson
+from pythonjsonlogger.json import JsonFormatter
+
+
+class OrjsonFormatter(JsonFormatter):
+    """JsonFormatter that serializes each record with orjson instead of stdlib json."""
+    def jsonify_log_record(self, log_record):
+        # Anything orjson can't encode natively (exceptions, custom extras) is logged as str()
+        return orjson.dumps(log_record, default=self.json_default or str).decode()
+
 
 def setup_logging():
     """
@@ -20,7 +29,7 @@ def setup_logging():
 
     # Use a custom formatter for JSON output
     # Add any fields you want to be standard in every log message here
-    formatter = jsonlogger.JsonFormatter(
+    formatter = OrjsonFormatter(
         '%(asctime)s %(name)s %(levelname)s %(message)s %(module)s %(funcName)s %(lineno)d'
     )
 
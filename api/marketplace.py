@@ -36,9 +36,20 @@ class Agent(BaseModel):
     downloads: Optional[int] = 0
     featured_order: Optional[int] = None
 
+def _connect():
+    """Open a connection to the marketplace DB."""
+    conn = sqlite3.connect(DB_PATH)
+    # Safe with WAL (set once in init_db): commits no longer fsync every write
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Keep the /agents ORDER BY sort out of temp files
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
 # Initialize database
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
+    # WAL is stored in the DB file: readers don't block the download-counter writes
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
     
     # Check if the table exists
@@ -89,14 +100,26 @@ def init_db():
 # Initialize the database at module load
 init_db()
 
+def delete_agents_by_author(author_id: str) -> int:
+    """Delete every agent published by `author_id` and return how many were removed. Blocking."""
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM agents WHERE author_id = ?", (author_id,))
+    deleted = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
 # Routes
+# The DB routes are plain `def`: FastAPI runs them in its threadpool, so the blocking
+# sqlite3 calls don't stall the event loop the chat requests are streaming on.
 @marketplace_router.get("/marketplace-status")
 async def marketplace_root():
     return {"status": "Marketplace service is running"}
 
 @marketplace_router.get("/agents")
-async def list_agents():
-    conn = sqlite3.connect(DB_PATH)
+def list_agents():
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     # Sort by: featured agents first, then by downloads, then by date
@@ -114,8 +137,8 @@ async def list_agents():
     return agents
 
 @marketplace_router.get("/agents/{agent_id}")
-async def get_agent(agent_id: str):
-    conn = sqlite3.connect(DB_PATH)
+def get_agent(agent_id: str):
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -135,8 +158,8 @@ async def get_agent(agent_id: str):
     return dict(agent)
 
 @marketplace_router.post("/agents")
-async def create_agent(agent: Agent, user: AuthUser):
-    conn = sqlite3.connect(DB_PATH)
+def create_agent(agent: Agent, user: AuthUser):
+    conn = _connect()
     cursor = conn.cursor()
 
     if not agent.date_added:
@@ -171,8 +194,8 @@ async def create_agent(agent: Agent, user: AuthUser):
     return {"success": True, "id": agent.id}
 
 @marketplace_router.get("/agents/statistics")
-async def get_agent_statistics():
-    conn = sqlite3.connect(DB_PATH)
+def get_agent_statistics():
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -203,8 +226,8 @@ async def get_agent_statistics():
     }
 
 @marketplace_router.delete("/agents/{agent_id}")
-async def delete_agent(agent_id: str, user: AuthUser):
-    conn = sqlite3.connect(DB_PATH)
+def delete_agent(agent_id: str, user: AuthUser):
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
@@ -226,8 +249,8 @@ async def delete_agent(agent_id: str, user: AuthUser):
     return {"success": True}
 
 @marketplace_router.get("/agents/by-author/{author_id}")
-async def get_agents_by_author(author_id: str):
-    conn = sqlite3.connect(DB_PATH)
+def get_agents_by_author(author_id: str):
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM agents WHERE author_id = ?", (author_id,))
@@ -31,6 +31,12 @@ messaging_router = APIRouter()
 # Temp images directory
 TEMP_IMAGES_DIR = Path("temp_images")
 
+# Twilio credentials are read once at startup; restart the process to rotate them
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
+
 # In-memory storage for pending voice call messages
 # Maps call_sid -> message text that should be spoken
 pending_voice_calls = {}
@@ -166,7 +172,7 @@ async def validate_twilio_request(request: Request) -> dict:
     Returns the parsed form data as a dict.
     """
     # Get Twilio auth token
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    auth_token = TWILIO_AUTH_TOKEN
     if not auth_token:
         logger.error("TWILIO_AUTH_TOKEN not configured - cannot validate webhooks!")
         raise HTTPException(status_code=500, detail="Server configuration error")
@@ -419,10 +425,10 @@ class TwilioConfig(BaseModel):
 # Twilio Dependency
 def get_twilio_config():
     """Dependency to load and validate Twilio credentials."""
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    from_number = os.getenv("TWILIO_PHONE_NUMBER")
-    whatsapp_from_number = os.getenv("TWILIO_WHATSAPP_NUMBER")
+    account_sid = TWILIO_ACCOUNT_SID
+    auth_token = TWILIO_AUTH_TOKEN
+    from_number = TWILIO_PHONE_NUMBER
+    whatsapp_from_number = TWILIO_WHATSAPP_NUMBER
 
     if not all([account_sid, auth_token, from_number, whatsapp_from_number]):
         logger.error("Server is missing required TWILIO environment variables (including WHATSAPP_NUMBER).")
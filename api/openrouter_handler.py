@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 import os
-import json
 import logging
 import time
+import orjson
 import httpx # Use httpx for async requests
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 
 # Import base class and custom exceptions
-from api_handlers import BaseAPIHandler, ConfigError, BackendAPIError, HandlerError, get_http_client
+from api_handlers import (
+    BaseAPIHandler, ConfigError, BackendAPIError, HandlerError, get_http_client,
+    aiter_sse_lines, model_field_rewrite, rewrite_model_field, rewrite_sse_chunk,
+)
 
 logger = logging.getLogger("openrouter_handler")
 
@@ -97,6 +100,12 @@ class OpenRouterAPIHandler(BaseAPIHandler):
              "pro": model_info.get("pro", False) }
             for display_name, model_info in self.model_map.items()
         ]
+        # Precompiled per display name, used to rewrite the model field without re-parsing responses
+        self._model_field_rewrites = {
+            display_name: model_field_rewrite(model_info["model_id"], display_name)
+            for display_name, model_info in self.model_map.items()
+            if model_info.get("model_id")
+        }
         # --- End Model Mapping ---
 
 
@@ -120,7 +129,7 @@ class OpenRouterAPIHandler(BaseAPIHandler):
         """
         Process a /v1/chat/completions request asynchronously via OpenRouter.
         Translates display model name to actual OpenRouter model ID.
-        Returns either dict (non-streaming) or StreamingResponse (streaming).
+        Returns either Response (non-streaming, upstream bytes) or StreamingResponse (streaming).
         """
         if not self.api_key:
             raise ConfigError("OPENROUTER_API_KEY is not configured on the server.")
@@ -128,7 +137,7 @@ class OpenRouterAPIHandler(BaseAPIHandler):
         # --- Get Display Name and Translate to Actual Model ID ---
         display_model_name = request_data.get("model")
         if not display_model_name:
-            raise ValueError("Request data must include a 'model' field (using the display name).")
+            raise HandlerError("Request data must include a 'model' field (using the display name).", status_code=400)
 
         # --- Special Case: NULL Model ---
         if display_model_name == "NULL":
@@ -167,13 +176,13 @@ class OpenRouterAPIHandler(BaseAPIHandler):
         model_info = self.model_map.get(display_model_name)
         if not model_info:
             # If the display name isn't found, the model is unsupported by this mapping
-            logger.warning(f"Received request for unmapped OpenRouter model display name: {display_model_name}")
-            raise ValueError(f"Model display name '{display_model_name}' is not recognized or supported.")
+            logger.warning("Received request for unmapped OpenRouter model display name: %s", display_model_name)
+            raise HandlerError(f"Model display name '{display_model_name}' is not recognized or supported.", status_code=404)
 
         actual_model_id = model_info.get("model_id")
         if not actual_model_id:
              # Should not happen if map is defined correctly, but good practice to check
-             logger.error(f"Internal configuration error: Missing 'model_id' for display name '{display_model_name}' in model_map.")
+             logger.error("Internal configuration error: Missing 'model_id' for display name '%s' in model_map.", display_model_name)
              raise ConfigError(f"Internal mapping error for model '{display_model_name}'.")
         # --- End Translation ---
 
@@ -187,7 +196,7 @@ class OpenRouterAPIHandler(BaseAPIHandler):
         headers = self.base_headers.copy()
         headers["Authorization"] = f"Bearer {self.api_key}"
 
-        logger.info(f"Calling OpenRouter API: display_model='{display_model_name}', actual_model='{actual_model_id}', streaming={payload.get('stream', False)}")
+        logger.info("Calling OpenRouter API: display_model='%s', actual_model='%s', streaming=%s", display_model_name, actual_model_id, payload.get('stream', False))
 
         # --- Check for streaming ---
         if payload.get("stream", False):
@@ -199,84 +208,66 @@ class OpenRouterAPIHandler(BaseAPIHandler):
         # --- Make Non-Streaming API Call using httpx ---
         try:
             client = get_http_client()
-            response = await client.post(self.OPENROUTER_API_URL, headers=headers, json=payload)
+            response = await client.post(self.OPENROUTER_API_URL, headers=headers, content=orjson.dumps(payload))
             response.raise_for_status()
-            response_data = response.json()
 
         # --- Error Handling (keep as before) ---
         except httpx.RequestError as exc:
-            logger.error(f"OpenRouter API request failed (network/connection): {exc}")
+            logger.error("OpenRouter API request failed (network/connection): %s", exc)
             raise BackendAPIError(f"Could not connect to OpenRouter API: {exc}", status_code=503) from exc
         except httpx.HTTPStatusError as exc:
             error_body = exc.response.text
             status_code = exc.response.status_code
-            logger.error(f"OpenRouter API returned error {status_code} for model {actual_model_id}: {error_body[:500]}")
+            logger.error("OpenRouter API returned error %s for model %s: %s", status_code, actual_model_id, error_body[:500])
             try:
-                error_json = exc.response.json()
+                error_json = orjson.loads(exc.response.content)
                 message = error_json.get("error", {}).get("message", error_body)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 message = error_body
             raise BackendAPIError(f"OpenRouter API Error ({status_code}): {message}", status_code=status_code) from exc
         except Exception as exc:
-            logger.exception(f"An unexpected error occurred during OpenRouter API call for model {actual_model_id}")
+            logger.exception("An unexpected error occurred during OpenRouter API call for model %s", actual_model_id)
             raise HandlerError(f"Unexpected error processing OpenRouter request: {exc}") from exc
 
-        # --- Log Conversation (using display name for consistency if desired) ---
-        prompt_text = ""
-        response_text = ""
-        try:
-            messages = request_data.get("messages", [])
-            if messages and isinstance(messages[-1].get("content"), str):
-                prompt_text = messages[-1].get("content", "")[:500]
-            if 'choices' in response_data and response_data['choices']:
-                 choice = response_data['choices'][0]
-                 if 'message' in choice and 'content' in choice['message']:
-                      response_text = choice['message']['content'][:500]
-        except Exception as log_parse_err:
-            logger.warning(f"Could not parse prompt/response for logging: {log_parse_err}")
-
-        # --- Conversation logging now handled centrally in compute.py ---
-
         # --- Return Response ---
-        # Modify the response payload to show the *display name* instead of the actual ID? Optional.
-        # If you want the client to see the pretty name in the response:
-        if "model" in response_data:
-             response_data["model"] = display_model_name # Replace actual ID with display name
+        # Upstream bytes are passed through untouched apart from showing the *display name*
+        # in the top-level model field; only parsed when upstream reports some other id
+        body = rewrite_model_field(response.content, self._model_field_rewrites[display_model_name], display_model_name)
 
-        logger.info(f"Successfully processed OpenRouter request for display model '{display_model_name}'.")
-        return response_data
+        logger.info("Successfully processed OpenRouter request for display model '%s'.", display_model_name)
+        return Response(content=body, media_type="application/json")
 
     async def _stream_openrouter_response(self, headers: dict, payload: dict, display_model_name: str, actual_model_id: str):
         """Stream SSE chunks from OpenRouter API."""
+        rewrite = self._model_field_rewrites[display_model_name]
         try:
             client = get_http_client()
-            async with client.stream("POST", self.OPENROUTER_API_URL, headers=headers, json=payload) as response:
+            async with client.stream("POST", self.OPENROUTER_API_URL, headers=headers, content=orjson.dumps(payload)) as response:
+                if response.is_error:
+                    await response.aread()  # So the status handler below can read the body
                 response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
+                async for line in aiter_sse_lines(response):
+                    if line.startswith(b"data: "):
                         # Replace actual model ID with display name in streaming chunks
                         chunk_data = line[6:]  # Remove "data: " prefix
-                        if chunk_data != "[DONE]":
-                            try:
-                                chunk_json = json.loads(chunk_data)
-                                if "model" in chunk_json:
-                                    chunk_json["model"] = display_model_name
-                                yield f"data: {json.dumps(chunk_json)}\n\n"
-                            except json.JSONDecodeError:
-                                # If we can't parse, just forward as-is
-                                yield f"data: {chunk_data}\n\n"
+                        if chunk_data != b"[DONE]":
+                            yield rewrite_sse_chunk(chunk_data, rewrite, display_model_name)
                         else:
-                            yield f"data: {chunk_data}\n\n"
+                            yield b"data: [DONE]\n\n"
         except httpx.RequestError as exc:
-            logger.error(f"OpenRouter streaming API request failed: {exc}")
-            yield f"data: {json.dumps({'error': f'Connection error: {exc}'})}\n\n"
+            logger.error("OpenRouter streaming API request failed: %s", exc)
+            # The error frame tells the client; raising after it tells compute.py (metrics, limiter back-off)
+            yield b"data: " + orjson.dumps({'error': f'Connection error: {exc}'}) + b"\n\n"
+            raise BackendAPIError(f"Could not connect to OpenRouter API: {exc}", status_code=503) from exc
         except httpx.HTTPStatusError as exc:
             error_body = exc.response.text
-            logger.error(f"OpenRouter streaming API error {exc.response.status_code}: {error_body[:500]}")
-            yield f"data: {json.dumps({'error': f'API error ({exc.response.status_code}): {error_body}'})}\n\n"
+            logger.error("OpenRouter streaming API error %s: %s", exc.response.status_code, error_body[:500])
+            yield b"data: " + orjson.dumps({'error': f'API error ({exc.response.status_code}): {error_body}'}) + b"\n\n"
+            raise BackendAPIError(f"OpenRouter API Error ({exc.response.status_code}): {error_body}", status_code=exc.response.status_code) from exc
         except Exception as exc:
-            logger.exception(f"Unexpected error in OpenRouter streaming for model {actual_model_id}")
-            yield f"data: {json.dumps({'error': f'Unexpected error: {exc}'})}\n\n"
+            logger.exception("Unexpected error in OpenRouter streaming for model %s", actual_model_id)
+            yield b"data: " + orjson.dumps({'error': f'Unexpected error: {exc}'}) + b"\n\n"
+            raise HandlerError(f"Unexpected error in OpenRouter stream: {exc}") from exc
 
     async def _generate_null_stream(self):
         """Generate a minimal streaming response for the NULL model."""
@@ -284,10 +275,10 @@ class OpenRouterAPIHandler(BaseAPIHandler):
         created = int(time.time())
 
         # Send initial chunk with a single space
-        yield f"data: {json.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': created, 'model': 'NULL', 'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': ' '}, 'finish_reason': None}]})}\n\n"
+        yield b"data: " + orjson.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': created, 'model': 'NULL', 'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': ' '}, 'finish_reason': None}]}) + b"\n\n"
 
         # Send final chunk marking completion
-        yield f"data: {json.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': created, 'model': 'NULL', 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+        yield b"data: " + orjson.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': created, 'model': 'NULL', 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}) + b"\n\n"
 
         # Send [DONE] marker
-        yield "data: [DONE]\n\n"
+        yield b"data: [DONE]\n\n"
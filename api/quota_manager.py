@@ -2,12 +2,18 @@ import datetime
 import logging
 import os
 import asyncio
-import httpx
+import time
 import redis.asyncio as aioredis
 from typing import Dict
 
+from http_client import get_http_client
+
 logger = logging.getLogger('quota_manager')
 
+# Abuse alert credentials are read once at startup; restart the process to rotate them
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+ADMIN_TELEGRAM_CHAT_ID = os.getenv("ADMIN_TELEGRAM_CHAT_ID")
+
 # --- Configuration ---
 QUOTA_LIMITS = {
     "monitor": 60,
@@ -85,6 +91,12 @@ GEMINI_SECOND_LIMITS = {
     "max":   54_000,   # 15 hours
 }
 
+# In-process flood guard (per worker), checked before the request body is read.
+# Far looser than RATE_LIMIT_PER_MINUTE; it only sheds bursts before they reach Redis.
+FLOOD_RATE_PER_SECOND = 5
+FLOOD_BURST = 10
+_FLOOD_MAX_TRACKED = 10_000
+
 # --- Redis client ---
 _redis: aioredis.Redis | None = None
 
@@ -104,17 +116,17 @@ def _seconds_until_midnight() -> int:
 
 async def _send_abuse_alert_async(user_id: str, service: str):
     try:
-        telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        telegram_bot_token = TELEGRAM_BOT_TOKEN
         if not telegram_bot_token:
             logger.warning("Cannot send abuse alert: TELEGRAM_BOT_TOKEN not configured")
             return
 
-        admin_chat_id = os.getenv("ADMIN_TELEGRAM_CHAT_ID")
+        admin_chat_id = ADMIN_TELEGRAM_CHAT_ID
         message = f"⚠️ Rate limit exceeded!\n\nUser ID: {user_id}\nService: {service}\nTime: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         url = f"https://api.telegram.org/bot{telegram_bot_token}/sendMessage"
 
-        async with httpx.AsyncClient(timeout=5) as client:
-            await client.post(url, json={"chat_id": admin_chat_id, "text": message})
+        client = get_http_client()
+        await client.post(url, json={"chat_id": admin_chat_id, "text": message}, timeout=5)
         logger.info(f"Sent abuse alert for user {user_id}")
     except Exception as e:
         logger.error(f"Failed to send abuse alert: {e}")
@@ -137,6 +149,27 @@ async def increment_usage(user_id: str, service: str) -> int:
 
     return new_count
 
+_flood_buckets: Dict[str, tuple[float, float]] = {}  # user_id -> (tokens, last refill time)
+
+def allow_request_burst(user_id: str) -> bool:
+    """
+    Token-bucket check against FLOOD_RATE_PER_SECOND / FLOOD_BURST for this worker.
+    Returns False if the user is flooding. No I/O, so it can run before anything else.
+    """
+    now = time.monotonic()
+    tokens, last = _flood_buckets.get(user_id, (FLOOD_BURST, now))
+    tokens = min(FLOOD_BURST, tokens + (now - last) * FLOOD_RATE_PER_SECOND)
+    if tokens < 1:
+        _flood_buckets[user_id] = (tokens, now)
+        return False
+    if len(_flood_buckets) >= _FLOOD_MAX_TRACKED and user_id not in _flood_buckets:
+        # Forget users whose bucket has refilled; they would start full anyway
+        refilled = [uid for uid, (t, ts) in _flood_buckets.items() if t + (now - ts) * FLOOD_RATE_PER_SECOND >= FLOOD_BURST]
+        for uid in refilled:
+            del _flood_buckets[uid]
+    _flood_buckets[user_id] = (tokens - 1, now)
+    return True
+
 async def get_usage_for_service(user_id: str, service: str) -> int:
     r = await get_redis()
     val = await r.get(f"quota:{user_id}:{service}")
@@ -147,6 +180,15 @@ async def is_rate_limited(user_id: str) -> bool:
     val = await r.get(f"ratelimit:{user_id}")
     return int(val) >= RATE_LIMIT_PER_MINUTE if val else False
 
+def _quota_limit(service: str, is_pro: bool, is_max: bool, is_plus: bool) -> int:
+    if is_max:
+        return MAX_QUOTA_LIMITS[service]
+    elif is_pro:
+        return PRO_QUOTA_LIMITS[service]
+    elif is_plus:
+        return PLUS_QUOTA_LIMITS[service]
+    return QUOTA_LIMITS[service]
+
 async def check_usage(
     user_id: str, service: str,
     is_pro: bool = False, is_max: bool = False, is_plus: bool = False
@@ -159,16 +201,50 @@ async def check_usage(
     val = await r.get(f"quota:{user_id}:{service}")
     current_usage = int(val) if val else 0
 
-    if is_max:
-        limit = MAX_QUOTA_LIMITS[service]
-    elif is_pro:
-        limit = PRO_QUOTA_LIMITS[service]
-    elif is_plus:
-        limit = PLUS_QUOTA_LIMITS[service]
-    else:
-        limit = QUOTA_LIMITS[service]
+    return current_usage >= _quota_limit(service, is_pro, is_max, is_plus)
+
+# Rate limit + daily quota in one round-trip. Returns {status, usage}: 0 = allowed,
+# 1 = rate limited, 2 = quota exhausted. Rejected requests are rolled back so they
+# don't consume either counter, same as check_usage() + increment_usage().
+_INCREMENT_AND_CHECK_LUA = """
+local rl = redis.call('INCR', KEYS[1])
+if rl == 1 then redis.call('EXPIRE', KEYS[1], 60) end
+if rl > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return {1, 0}
+end
+local used = redis.call('INCR', KEYS[2])
+if used == 1 then redis.call('EXPIRE', KEYS[2], ARGV[3]) end
+if used > tonumber(ARGV[2]) then
+    redis.call('DECR', KEYS[2])
+    redis.call('DECR', KEYS[1])
+    return {2, used - 1}
+end
+return {0, used}
+"""
+_increment_and_check_script = None
+
+async def increment_and_check(
+    user_id: str, service: str,
+    is_pro: bool = False, is_max: bool = False, is_plus: bool = False
+) -> tuple[int, bool]:
+    """
+    Atomically check and consume one request of `service` for the user.
+    Returns (usage_count, limited). Unlike check_usage() followed by increment_usage(),
+    concurrent requests can't both pass the check and overshoot the limit.
+    """
+    global _increment_and_check_script
+    r = await get_redis()
+    if _increment_and_check_script is None:
+        _increment_and_check_script = r.register_script(_INCREMENT_AND_CHECK_LUA)
 
-    return current_usage >= limit
+    status, usage = await _increment_and_check_script(
+        keys=[f"ratelimit:{user_id}", f"quota:{user_id}:{service}"],
+        args=[RATE_LIMIT_PER_MINUTE, _quota_limit(service, is_pro, is_max, is_plus), _seconds_until_midnight()],
+    )
+    if status == 1:
+        asyncio.create_task(_send_abuse_alert_async(user_id, service))
+    return usage, status != 0
 
 async def get_all_usage_data() -> dict:
     r = await get_redis()
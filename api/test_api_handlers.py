@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests for AdaptiveLimiter. Run from api/ with `python -m unittest`."""
+import asyncio
+import unittest
+
+from api_handlers import AdaptiveLimiter, BackendAPIError
+
+
+class AdaptiveLimiterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cancel_then_release(self):
+        limiter = AdaptiveLimiter("test", maximum=1)
+        held = await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0) # Let it queue
+
+        # The disconnect cancels the waiter; the release runs before the task resumes
+        queued.cancel()
+        held.release()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertFalse(limiter._waiters)
+
+    async def test_timeout_then_release(self):
+        limiter = AdaptiveLimiter("test", maximum=1, queue_timeout=0)
+        held = await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0) # Let it queue (and schedule its timeout)
+        await asyncio.sleep(0) # Let the timeout cancel the waiter
+
+        # The release runs before the timed-out task resumes
+        held.release()
+
+        with self.assertRaises(BackendAPIError) as ctx:
+            await queued
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertFalse(limiter._waiters)
+
+    async def test_handoff_to_cancelled_waiter_passes_it_on(self):
+        limiter = AdaptiveLimiter("test", maximum=1)
+        held = await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0) # Let both queue
+
+        # The slot is handed to `first`, which is cancelled before it resumes
+        held.release()
+        first.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        slot = await asyncio.wait_for(second, 1) # Only arrives if `first` passed the slot on
+        self.assertEqual(limiter.in_flight, 1)
+        slot.release()
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_handoff_to_timed_out_waiter_passes_it_on(self):
+        limiter = AdaptiveLimiter("test", maximum=1, queue_timeout=0)
+        held = await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0) # Let it queue (and schedule its timeout)
+        limiter.queue_timeout = 30.0
+        second = asyncio.create_task(limiter.acquire())
+
+        # The slot is handed to `first` just before its timeout fires
+        held.release()
+
+        with self.assertRaises(BackendAPIError):
+            await first
+        slot = await asyncio.wait_for(second, 1) # Only arrives if `first` passed the slot on
+        self.assertEqual(limiter.in_flight, 1)
+        slot.release()
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
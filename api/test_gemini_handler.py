@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Tests for Gemini image validation. Run from api/ with `python -m unittest`."""
+import base64
+import unittest
+from unittest import mock
+
+import api_handlers # Loads the handler modules in the order the app does
+import gemini_handler
+from gemini_handler import _parse_content_list, _validate_image_data
+
+PNG_B64 = base64.b64encode(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4).decode()
+
+
+def _image_item(base64_data):
+    return {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_data}"}}
+
+
+class ValidateImageDataTest(unittest.TestCase):
+
+    def test_valid_image_is_forwarded_unchanged(self):
+        parts = []
+        self.assertEqual(_parse_content_list([_image_item(PNG_B64)], parts), 1)
+        self.assertEqual(parts, [{"inline_data": {"mime_type": "image/png", "data": PNG_B64}}])
+
+    def test_whitespace_wrapped_base64_is_accepted(self):
+        wrapped = "\r\n".join(PNG_B64[i:i + 76] for i in range(0, len(PNG_B64), 76)) + "\n"
+        parts = []
+        _parse_content_list([_image_item(wrapped)], parts)
+        self.assertEqual(parts[0]["inline_data"]["data"], PNG_B64)
+
+    def test_invalid_base64_is_rejected_with_400(self):
+        with self.assertRaises(api_handlers.HandlerError) as ctx:
+            _validate_image_data("not*base64!")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_oversize_image_is_rejected_with_413(self):
+        with mock.patch.object(gemini_handler, "_MAX_INLINE_IMAGE_BYTES", 100):
+            with self.assertRaises(api_handlers.HandlerError) as ctx:
+                _validate_image_data(PNG_B64)
+        self.assertEqual(ctx.exception.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,6 +19,7 @@ from admin_auth import get_admin_access
 # Import the new, unified quota manager functions and constants
 from quota_manager import increment_usage, get_all_usage_data, check_usage
 from messaging import save_temp_image
+from http_client import get_http_client
 
 # --- Setup ---
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +29,13 @@ tools_router = APIRouter()
 # Temp images directory
 TEMP_IMAGES_DIR = Path("temp_images")
 
+# Service credentials are read once at startup; restart the process to rotate them
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
+PUSHOVER_API_KEY = os.getenv("PUSHOVER_API_KEY")
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+
 
 # --- Pydantic Models ---
 
@@ -96,8 +104,8 @@ async def send_email(
     logger.info(f"Processing email for user_id: {current_user.id} to {request_data.to_email}")
 
     # 4. Action: Send the Email
-    sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
-    from_email = os.getenv("SENDGRID_FROM_EMAIL")
+    sendgrid_api_key = SENDGRID_API_KEY
+    from_email = SENDGRID_FROM_EMAIL
 
     if not all([sendgrid_api_key, from_email]):
         logger.error("Server is missing SENDGRID_API_KEY or SENDGRID_FROM_EMAIL.")
@@ -166,7 +174,7 @@ async def send_pushover(
 ):
     """Sends a notification via Pushover, checking against a quota."""
     # 1. Get the secret application token from the server environment
-    pushover_app_token = os.getenv("PUSHOVER_API_KEY")
+    pushover_app_token = PUSHOVER_API_KEY
     if not pushover_app_token:
         logger.error("Server is missing PUSHOVER_API_KEY environment variable.")
         raise HTTPException(status_code=500, detail="Notification service (Pushover) is not configured on the server.")
@@ -200,26 +208,26 @@ async def send_pushover(
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Send images as file attachments if provided
-            if request_data.images:
-                files = {}
-                for i, image_b64 in enumerate(request_data.images):
-                    try:
-                        # Decode base64 image
-                        image_data = base64.b64decode(image_b64)
-                        # Pushover supports "attachment" parameter for images
-                        files["attachment"] = (f"image_{i+1}.png", image_data, "image/png")
-                        # Pushover only supports one image, so we'll use the first one
-                        break
-                    except Exception as e:
-                        logger.warning(f"Failed to process image {i+1} for user {current_user.id}: {str(e)}")
-                
-                response = await client.post(pushover_api_url, data=data, files=files)
-            else:
-                response = await client.post(pushover_api_url, data=data)
-                
-            response.raise_for_status() # Raises an exception for 4xx or 5xx status codes
+        client = get_http_client()
+        # Send images as file attachments if provided
+        if request_data.images:
+            files = {}
+            for i, image_b64 in enumerate(request_data.images):
+                try:
+                    # Decode base64 image
+                    image_data = base64.b64decode(image_b64)
+                    # Pushover supports "attachment" parameter for images
+                    files["attachment"] = (f"image_{i+1}.png", image_data, "image/png")
+                    # Pushover only supports one image, so we'll use the first one
+                    break
+                except Exception as e:
+                    logger.warning(f"Failed to process image {i+1} for user {current_user.id}: {str(e)}")
+            
+            response = await client.post(pushover_api_url, data=data, files=files, timeout=5.0)
+        else:
+            response = await client.post(pushover_api_url, data=data, timeout=5.0)
+            
+        response.raise_for_status() # Raises an exception for 4xx or 5xx status codes
 
         response_data = response.json()
         if response_data.get("status") != 1:
@@ -247,7 +255,7 @@ async def send_telegram(
 ):
     """Sends a message via Telegram bot, checking against quota."""
     # 1. Get bot token from environment
-    telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    telegram_bot_token = TELEGRAM_BOT_TOKEN
     if not telegram_bot_token:
         logger.error("Server is missing TELEGRAM_BOT_TOKEN environment variable.")
         raise HTTPException(status_code=500, detail="Telegram service is not configured on the server.")
@@ -270,83 +278,83 @@ async def send_telegram(
     message_ids = []
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # Send images first
-            if request_data.images:
-                for i, image_b64 in enumerate(request_data.images):
-                    try:
-                        # Decode base64 image
-                        image_data = base64.b64decode(image_b64)
-
-                        # Send photo via Telegram API
-                        photo_url = f"https://api.telegram.org/bot{telegram_bot_token}/sendPhoto"
-                        files = {"photo": ("image.png", image_data, "image/png")}
-                        data = {"chat_id": request_data.chat_id}
-
-                        photo_response = await client.post(photo_url, files=files, data=data)
-                        photo_response.raise_for_status()
-
-                        photo_data = photo_response.json()
-                        if not photo_data.get("ok"):
-                            error_description = photo_data.get("description", "Unknown error")
-                            logger.error(f"Telegram photo API error for user {current_user.id}: {error_description}")
-                            raise HTTPException(status_code=400, detail=f"Telegram photo API error: {error_description}")
-
-                        message_ids.append(photo_data.get('result', {}).get('message_id'))
-                        logger.info(f"Telegram image {i+1} sent successfully for user {current_user.id}")
-
-                    except Exception as e:
-                        logger.warning(f"Failed to process image {i+1} for user {current_user.id}: {str(e)}")
-
-            # Send videos
-            if request_data.videos:
-                for i, video_b64 in enumerate(request_data.videos):
-                    try:
-                        # Decode base64 video
-                        video_data = base64.b64decode(video_b64)
-
-                        # Send video via Telegram API
-                        video_url = f"https://api.telegram.org/bot{telegram_bot_token}/sendVideo"
-                        files = {"video": ("video.mp4", video_data, "video/mp4")}
-                        data = {"chat_id": request_data.chat_id}
-
-                        video_response = await client.post(video_url, files=files, data=data)
-                        video_response.raise_for_status()
-
-                        video_data_response = video_response.json()
-                        if not video_data_response.get("ok"):
-                            error_description = video_data_response.get("description", "Unknown error")
-                            logger.error(f"Telegram video API error for user {current_user.id}: {error_description}")
-                            raise HTTPException(status_code=400, detail=f"Telegram video API error: {error_description}")
-
-                        message_ids.append(video_data_response.get('result', {}).get('message_id'))
-                        logger.info(f"Telegram video {i+1} sent successfully for user {current_user.id}")
-
-                    except Exception as e:
-                        logger.warning(f"Failed to process video {i+1} for user {current_user.id}: {str(e)}")
-
-            # Determine if we sent media for smart default
-            sent_media = bool(message_ids)  # message_ids populated from image/video sending above
-            message_text = request_data.message or ("Media from Observer AI" if sent_media else "Alert from Observer AI")
-
-            # Always send text message with default logic
-            message_url = f"https://api.telegram.org/bot{telegram_bot_token}/sendMessage"
-            payload = {
-                "chat_id": request_data.chat_id,
-                "text": message_text,
-                "parse_mode": "HTML"  # Allows basic HTML formatting
-            }
+        client = get_http_client()
+        # Send images first
+        if request_data.images:
+            for i, image_b64 in enumerate(request_data.images):
+                try:
+                    # Decode base64 image
+                    image_data = base64.b64decode(image_b64)
+
+                    # Send photo via Telegram API
+                    photo_url = f"https://api.telegram.org/bot{telegram_bot_token}/sendPhoto"
+                    files = {"photo": ("image.png", image_data, "image/png")}
+                    data = {"chat_id": request_data.chat_id}
+
+                    photo_response = await client.post(photo_url, files=files, data=data, timeout=60.0)
+                    photo_response.raise_for_status()
+
+                    photo_data = photo_response.json()
+                    if not photo_data.get("ok"):
+                        error_description = photo_data.get("description", "Unknown error")
+                        logger.error(f"Telegram photo API error for user {current_user.id}: {error_description}")
+                        raise HTTPException(status_code=400, detail=f"Telegram photo API error: {error_description}")
+
+                    message_ids.append(photo_data.get('result', {}).get('message_id'))
+                    logger.info(f"Telegram image {i+1} sent successfully for user {current_user.id}")
+
+                except Exception as e:
+                    logger.warning(f"Failed to process image {i+1} for user {current_user.id}: {str(e)}")
+
+        # Send videos
+        if request_data.videos:
+            for i, video_b64 in enumerate(request_data.videos):
+                try:
+                    # Decode base64 video
+                    video_data = base64.b64decode(video_b64)
+
+                    # Send video via Telegram API
+                    video_url = f"https://api.telegram.org/bot{telegram_bot_token}/sendVideo"
+                    files = {"video": ("video.mp4", video_data, "video/mp4")}
+                    data = {"chat_id": request_data.chat_id}
+
+                    video_response = await client.post(video_url, files=files, data=data, timeout=60.0)
+                    video_response.raise_for_status()
+
+                    video_data_response = video_response.json()
+                    if not video_data_response.get("ok"):
+                        error_description = video_data_response.get("description", "Unknown error")
+                        logger.error(f"Telegram video API error for user {current_user.id}: {error_description}")
+                        raise HTTPException(status_code=400, detail=f"Telegram video API error: {error_description}")
+
+                    message_ids.append(video_data_response.get('result', {}).get('message_id'))
+                    logger.info(f"Telegram video {i+1} sent successfully for user {current_user.id}")
+
+                except Exception as e:
+                    logger.warning(f"Failed to process video {i+1} for user {current_user.id}: {str(e)}")
+
+        # Determine if we sent media for smart default
+        sent_media = bool(message_ids)  # message_ids populated from image/video sending above
+        message_text = request_data.message or ("Media from Observer AI" if sent_media else "Alert from Observer AI")
+
+        # Always send text message with default logic
+        message_url = f"https://api.telegram.org/bot{telegram_bot_token}/sendMessage"
+        payload = {
+            "chat_id": request_data.chat_id,
+            "text": message_text,
+            "parse_mode": "HTML"  # Allows basic HTML formatting
+        }
+
+        response = await client.post(message_url, json=payload, timeout=60.0)
+        response.raise_for_status()
 
-            response = await client.post(message_url, json=payload)
-            response.raise_for_status()
-
-            response_data = response.json()
-            if not response_data.get("ok"):
-                error_description = response_data.get("description", "Unknown error")
-                logger.error(f"Telegram API error for user {current_user.id}: {error_description}")
-                raise HTTPException(status_code=400, detail=f"Telegram API error: {error_description}")
+        response_data = response.json()
+        if not response_data.get("ok"):
+            error_description = response_data.get("description", "Unknown error")
+            logger.error(f"Telegram API error for user {current_user.id}: {error_description}")
+            raise HTTPException(status_code=400, detail=f"Telegram API error: {error_description}")
 
-            message_ids.append(response_data.get('result', {}).get('message_id'))
+        message_ids.append(response_data.get('result', {}).get('message_id'))
 
         logger.info(f"Telegram message sent successfully for user {current_user.id}. Message IDs: {message_ids}")
         return {"success": True, "detail": "Telegram message sent successfully.", "message_ids": message_ids}
@@ -365,7 +373,7 @@ async def telegram_webhook(request: Request, update: dict):
     Webhook endpoint for Telegram bot to automatically respond with chat IDs.
     This endpoint should be registered with Telegram via setWebhook with a secret_token.
     """
-    webhook_secret = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+    webhook_secret = TELEGRAM_WEBHOOK_SECRET
     if webhook_secret:
         incoming = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
         if not hmac.compare_digest(incoming, webhook_secret):
@@ -378,7 +386,7 @@ async def telegram_webhook(request: Request, update: dict):
             chat_id = message["chat"]["id"]
             chat_type = message["chat"]["type"]
             # Get bot token
-            telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+            telegram_bot_token = TELEGRAM_BOT_TOKEN
             if not telegram_bot_token:
                 logger.error("TELEGRAM_BOT_TOKEN not configured")
                 return {"ok": True}  # Return OK to Telegram anyway
@@ -390,8 +398,8 @@ async def telegram_webhook(request: Request, update: dict):
                 "text": response_text,
                 "parse_mode": "HTML"
             }
-            async with httpx.AsyncClient() as client:
-                await client.post(telegram_api_url, json=payload)
+            client = get_http_client()
+            await client.post(telegram_api_url, json=payload, timeout=5.0)
             logger.info(f"Auto-responded to chat_id {chat_id} with their chat ID")
         return {"ok": True}
     except Exception as e:
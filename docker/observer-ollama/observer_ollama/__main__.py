@@ -2,7 +2,7 @@
 import argparse
 import logging
 import os
-from .server import run_server
+from .server import run_server, DEFAULT_MAX_WORKERS
 from .ollama_client import set_ollama_destination
 
 # Setup root logging configuration
@@ -28,6 +28,7 @@ def main():
 
     server_group = parser.add_argument_group('Server Configuration')
     server_group.add_argument("--port", type=int, default=os.environ.get("PORT", "3838"), help="Port to run the proxy server on. Overrides PORT env var.")
+    server_group.add_argument("--max-workers", type=int, default=os.environ.get("PROXY_MAX_WORKERS", DEFAULT_MAX_WORKERS), help="Maximum concurrently served connections; each streamed generation holds one for its whole response. Overrides PROXY_MAX_WORKERS env var.")
     server_group.add_argument("--dev", action="store_true", help="Enable development mode (e.g., allows all CORS origins).")
 
     # --- Modified: SSL configuration using the new pattern ---
@@ -79,7 +80,8 @@ def main():
         cert_dir=args.cert_dir, 
         dev_mode=args.dev, 
         use_ssl=args.use_ssl,
-        enable_legacy_translation=args.enable_legacy_translation
+        enable_legacy_translation=args.enable_legacy_translation,
+        max_workers=args.max_workers
     )
 
 if __name__ == "__main__":
@@ -3,6 +3,17 @@ import logging
 
 logger = logging.getLogger('ollama-proxy.cors')
 
+# These never change, so they are encoded once and appended to the header buffer as one blob
+_STATIC_CORS_HEADERS = b"".join(
+    f"{keyword}: {value}\r\n".encode('latin-1', 'strict')
+    for keyword, value in (
+        ("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
+        ("Access-Control-Allow-Headers", "Content-Type, Authorization, User-Agent"),
+        ("Access-Control-Allow-Credentials", "true"),
+        ("Access-Control-Max-Age", "86400"), # 24 hours
+    )
+)
+
 class CorsMixin:
     """A mixin to handle CORS headers for the proxy."""
     def send_cors_headers(self):
@@ -14,15 +25,16 @@ class CorsMixin:
         # Allow any origin in dev mode
         if self.server.dev_mode:
             self.send_header("Access-Control-Allow-Origin", origin or "*")
-            logger.debug(f"Dev mode: Allowing origin {origin or '*'}")
+            logger.debug("Dev mode: Allowing origin %s", origin or '*')
         elif origin in allowed_origins:
             self.send_header("Access-Control-Allow-Origin", origin)
-            logger.debug(f"Allowed specific origin: {origin}")
+            logger.debug("Allowed specific origin: %s", origin)
         else:
             # Fallback for other cases - you could be more restrictive here
             self.send_header("Access-Control-Allow-Origin", "*")
             
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization, User-Agent")
-        self.send_header("Access-Control-Allow-Credentials", "true")
-        self.send_header("Access-Control-Max-Age", "86400") # 24 hours
+        # Same buffering rules as BaseHTTPRequestHandler.send_header
+        if self.request_version != 'HTTP/0.9':
+            if not hasattr(self, '_headers_buffer'):
+                self._headers_buffer = []
+            self._headers_buffer.append(_STATIC_CORS_HEADERS)
@@ -2,6 +2,7 @@
 import http.server
 import json
 import logging
+import time
 from urllib.parse import urlparse, parse_qs 
 from .cors import CorsMixin
 from . import translator
@@ -9,6 +10,17 @@ from . import ollama_client
 
 logger = logging.getLogger('ollama-proxy.handler')
 
+# Request bodies are read in chunks under an overall deadline so slow uploads can't pin a worker
+BODY_READ_TIMEOUT = 30
+BODY_CHUNK_SIZE = 64 * 1024
+
+# Upstream response headers that describe the Ollama connection rather than the body;
+# this server frames its own response, so they are never copied through
+HOP_BY_HOP_HEADERS = frozenset({
+    'connection', 'keep-alive', 'transfer-encoding', 'content-length',
+    'proxy-authenticate', 'proxy-authorization', 'te', 'trailer', 'upgrade',
+})
+
 class OllamaProxyHandler(CorsMixin, http.server.BaseHTTPRequestHandler):
     """
     The main request handler.
@@ -16,13 +28,15 @@ class OllamaProxyHandler(CorsMixin, http.server.BaseHTTPRequestHandler):
     """
     
     # Your original, working log_message method
+    # Formatting is left to the logger so filtered (debug) access lines cost nothing
     def log_message(self, format, *args):
-        if '404' in args[1]:
-             logger.warning("%s - %s", self.address_string(), format % args)
-        elif args[1][0] in ['4', '5']:
-            logger.error("%s - %s", self.address_string(), format % args)
-        else:
-            logger.debug("%s - %s", self.address_string(), format % args)
+        status = str(args[1]) if len(args) > 1 else ''
+        if '404' in status:
+             logger.warning("%s - " + format, self.address_string(), *args)
+        elif status[:1] in ('4', '5'):
+            logger.error("%s - " + format, self.address_string(), *args)
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s - " + format, self.address_string(), *args)
 
     def do_OPTIONS(self):
         self.send_response(204)
@@ -54,24 +68,23 @@ class OllamaProxyHandler(CorsMixin, http.server.BaseHTTPRequestHandler):
 
     def _handle_modern_proxy(self, method):
         """A pure, simple proxy that streams requests and responses directly."""
-        logger.debug(f"Modern proxy for {method} {self.path}")
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length) if content_length > 0 else None
+        logger.debug("Modern proxy for %s %s", method, self.path)
+        try:
+            body = self._read_body()
+        except TimeoutError:
+            self._send_body_timeout()
+            return
 
         status, headers, response_iterator = ollama_client.forward_to_ollama(
             method, self.path, self.headers, body
         )
 
         self.send_response(status)
-        for key, val in headers:
-            if key.lower() not in ['transfer-encoding', 'connection', 'content-length']:
-                self.send_header(key, val)
+        self._send_upstream_headers(headers)
         self.send_cors_headers()
-        self.end_headers()
-        
+
         try:
-            for chunk in response_iterator:
-                self.wfile.write(chunk)
+            self._send_body_stream(response_iterator)
         except BrokenPipeError:
             logger.warning(f"Client disconnected during modern proxy stream for {self.path}.")
 
@@ -83,9 +96,12 @@ class OllamaProxyHandler(CorsMixin, http.server.BaseHTTPRequestHandler):
         logger.debug("Legacy translation path for /v1/chat/completions")
         method = 'POST' # This handler is only ever called for POST requests
         
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length) if content_length > 0 else None
-        
+        try:
+            body = self._read_body()
+        except TimeoutError:
+            self._send_body_timeout()
+            return
+
         path = self.path
         
         # This logic is copied directly from your original _proxy_request
@@ -93,38 +109,99 @@ class OllamaProxyHandler(CorsMixin, http.server.BaseHTTPRequestHandler):
         if is_chat_completions:
             original_model = 'unknown'
             is_streaming = False
+            request_data = None
             try:
                 request_data = json.loads(body)
                 original_model = request_data.get('model', 'unknown')
                 is_streaming = request_data.get('stream', False)
-            except (json.JSONDecodeError, AttributeError):
-                pass
-            path, body = translator.translate_request_to_ollama(body)
+            except (json.JSONDecodeError, AttributeError, TypeError):
+                request_data = None
+            # Hand over the parsed body so the translator doesn't decode it a second time
+            path, body = translator.translate_request_to_ollama(body, request_data)
 
         status, headers, response_iterator = ollama_client.forward_to_ollama(
             method, path, self.headers, body
         )
         
         self.send_response(status)
-        for key, val in headers:
-            if key.lower() not in ['transfer-encoding', 'connection', 'content-length']:
-                self.send_header(key, val)
+        self._send_upstream_headers(headers)
         self.send_cors_headers()
 
         if is_chat_completions and not is_streaming:
             full_response_body = b''.join(response_iterator)
             final_body = translator.translate_response_to_openai(full_response_body, original_model)
             self.send_header('Content-Length', str(len(final_body)))
-            self.end_headers()
-            self.wfile.write(final_body)
+            self._end_headers_with_body(final_body)
         else:
-            self.end_headers()
             try:
-                for chunk in response_iterator:
-                    self.wfile.write(chunk)
+                self._send_body_stream(response_iterator)
             except BrokenPipeError:
                 logger.warning("Client disconnected during legacy stream.")
 
+    def _send_upstream_headers(self, headers):
+        for key, val in headers:
+            if key.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(key, val)
+
+    def _read_body(self):
+        """
+        Read the request body in BODY_CHUNK_SIZE pieces, giving the client
+        BODY_READ_TIMEOUT seconds in total. Returns None when there is no body.
+        Raises TimeoutError if the deadline passes.
+
+        The body is read straight into one buffer sized from Content-Length and
+        returned as-is (a bytearray), so a large image payload is held once
+        rather than grown piecewise and then copied to bytes.
+        """
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length <= 0:
+            return None
+
+        body = bytearray(content_length)
+        received = 0
+        deadline = time.monotonic() + BODY_READ_TIMEOUT
+        previous_timeout = self.connection.gettimeout()
+        try:
+            with memoryview(body) as view:
+                while received < content_length:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("request body deadline exceeded")
+                    self.connection.settimeout(remaining)
+                    n = self.rfile.readinto1(view[received:received + BODY_CHUNK_SIZE])
+                    if not n:
+                        break # Client closed early; forward what arrived, as before
+                    received += n
+        finally:
+            self.connection.settimeout(previous_timeout)
+        if received < content_length:
+            del body[received:]
+        return body
+
+    def _send_body_timeout(self):
+        logger.warning("Timed out reading request body from %s for %s", self.address_string(), self.path)
+        self.close_connection = True
+        try:
+            self.send_error(408, "Request body not received in time")
+        except OSError:
+            pass
+
+    def _end_headers_with_body(self, body):
+        """
+        Like end_headers(), but sends the buffered header block and `body`
+        in a single write instead of two (one TLS record for small responses).
+        """
+        self._headers_buffer.append(b"\r\n")
+        if body:
+            self._headers_buffer.append(body)
+        self.flush_headers()
+
+    def _send_body_stream(self, response_iterator):
+        """Finish the headers together with the first body chunk, then stream the rest."""
+        self._end_headers_with_body(next(response_iterator, b''))
+        for chunk in response_iterator:
+            self.wfile.write(chunk)
+
     # --- Your Original Helper Methods (Unchanged) ---
 
     def _handle_favicon_request(self):
@@ -141,7 +218,6 @@ class OllamaProxyHandler(CorsMixin, http.server.BaseHTTPRequestHandler):
         self.send_header('Cache-Control', 'no-cache')
         self.send_header('Connection', 'keep-alive')
         self.send_cors_headers()
-        self.end_headers()
 
         # Send a single comment to keep connection valid, then close
-        self.wfile.write(b': stub SSE stream\n\n')
+        self._end_headers_with_body(b': stub SSE stream\n\n')
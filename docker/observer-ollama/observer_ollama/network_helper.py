@@ -1,11 +1,17 @@
 # ollama_proxy/network_helper.py
 import socket
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger('ollama-proxy.network')
 
+@lru_cache(maxsize=1)
 def get_local_ip():
-    """Get the local IP address for network access."""
+    """
+    Get the local IP address for network access.
+    Cached: the certificate SANs and the startup banner must agree, and the
+    route lookup only needs to happen once per process.
+    """
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(('8.8.8.8', 80))
@@ -1,10 +1,11 @@
 # ollama_proxy/ollama_client.py
 import os
-import urllib.request
-import urllib.error
+import http.client
+import threading
 import socket
 import logging
 import ssl
+from urllib.parse import urlsplit
 
 logger = logging.getLogger('ollama-proxy.client')
 
@@ -31,6 +32,52 @@ def set_ollama_destination(host, port):
 
 # --- End of new/modified code ---
 
+# One keep-alive connection to Ollama per proxy worker thread, so each forwarded
+# request doesn't pay for a fresh TCP (and possibly TLS) handshake
+_thread_local = threading.local()
+_REQUEST_TIMEOUT = 300
+_STREAM_CHUNK_SIZE = 8192
+
+def _get_connection():
+    """Return this thread's connection to OLLAMA_BASE_URL, opening a new one if needed."""
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is not None and _thread_local.base_url == OLLAMA_BASE_URL:
+        return conn, True
+    if conn is not None:
+        conn.close() # Destination changed
+    target = urlsplit(OLLAMA_BASE_URL)
+    if target.scheme == "https":
+        # Create an SSL context that does NOT verify certificates
+        conn = http.client.HTTPSConnection(target.hostname, target.port, timeout=_REQUEST_TIMEOUT,
+                                           context=ssl._create_unverified_context())
+        logger.debug("Using unverified SSL context for outgoing request.")
+    else:
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=_REQUEST_TIMEOUT)
+    _thread_local.conn = conn
+    _thread_local.base_url = OLLAMA_BASE_URL
+    return conn, False
+
+def _drop_connection():
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _thread_local.conn = None
+
+def _send(method, path, headers, body):
+    """Send the request on the pooled connection, reconnecting once if Ollama closed it while idle."""
+    conn, reused = _get_connection()
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        return conn.getresponse()
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+            http.client.CannotSendRequest, http.client.ResponseNotReady):
+        _drop_connection()
+        if not reused:
+            raise
+    conn, _ = _get_connection()
+    conn.request(method, path, body=body, headers=headers)
+    return conn.getresponse()
+
 def forward_to_ollama(method, path, headers, body):
     """
     Forwards a request to the Ollama service and streams the response.
@@ -39,51 +86,42 @@ def forward_to_ollama(method, path, headers, body):
         A tuple of (status_code, response_headers, response_iterator).
     """
     target_url = f"{OLLAMA_BASE_URL}{path}"
-    logger.debug(f"Forwarding {method} request to: {target_url}")
-
-    timeout = 300 
-    req = urllib.request.Request(target_url, data=body, method=method)
-    
-    for header in ['Content-Type', 'Authorization', 'User-Agent']:
-        if header in headers:
-            req.add_header(header, headers[header])
+    logger.debug("Forwarding %s request to: %s", method, target_url)
 
-    ssl_context = None
-    if target_url.startswith("https://"):
-        # Create an SSL context that does NOT verify certificates
-        ssl_context = ssl._create_unverified_context()
-        logger.debug("Using unverified SSL context for outgoing request.")
+    forward_headers = {header: headers[header] for header in ('Content-Type', 'Authorization', 'User-Agent') if header in headers}
 
     try:
-        # Pass the context to urlopen. If ssl_context is None, it uses the default (verifying) context.
-        response = urllib.request.urlopen(req, timeout=timeout, context=ssl_context)
-        
-        def response_iterator():
-            while True:
-                chunk = response.read(8192)
-                if not chunk:
-                    break
-                yield chunk
-        
-        return (response.status, response.getheaders(), response_iterator())
-
-    except urllib.error.HTTPError as e:
-        logger.error(f"HTTP error from Ollama: {e.code} - {e.reason}")
-        def error_iterator():
-            if e.fp:
-                while True:
-                    chunk = e.fp.read(8192)
-                    if not chunk:
-                        break
-                    yield chunk
-        return (e.code, e.headers, error_iterator())
-
+        response = _send(method, path, forward_headers, body)
     except socket.timeout:
+        _drop_connection()
         logger.error(f"Request to {target_url} timed out")
         error_body = b"Gateway Timeout: The request to Ollama timed out."
         return (504, [('Content-Type', 'text/plain')], (c for c in [error_body]))
-
     except Exception as e:
+        _drop_connection()
         logger.error(f"Proxy error when connecting to Ollama: {e}")
         error_body = f"Bad Gateway: The proxy encountered an error. {e}".encode()
         return (502, [('Content-Type', 'text/plain')], (c for c in [error_body]))
+
+    if response.status >= 400:
+        logger.error("HTTP error from Ollama: %s - %s", response.status, response.reason)
+
+    def response_iterator():
+        finished = False
+        try:
+            while True:
+                # read1 hands over whatever has arrived (e.g. one streamed token's chunk);
+                # read() would hold it back until a full _STREAM_CHUNK_SIZE had accumulated
+                chunk = response.read1(_STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            # read1 doesn't mark a length-delimited body done on its own
+            response.close()
+            finished = not response.will_close and not response.length
+        finally:
+            # A response abandoned mid-body (client went away) or marked close leaves the connection unusable
+            if not finished:
+                _drop_connection()
+
+    return (response.status, response.getheaders(), response_iterator())
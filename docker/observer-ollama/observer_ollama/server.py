@@ -1,28 +1,82 @@
 # ollama_proxy/server.py
 import socketserver
-import ssl
 import signal
 import sys
 import logging
-from .ssl_helper import prepare_certificates
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .ssl_helper import prepare_certificates, create_ssl_context
 from .network_helper import get_local_ip
 from .handler import OllamaProxyHandler
 
 logger = logging.getLogger('ollama-proxy.server')
 
+# Default cap on concurrently served connections. A streamed generation holds its
+# worker for the whole response, so this is sized for many long-lived streams
+DEFAULT_MAX_WORKERS = 256
 
-def run_server(port, cert_dir, dev_mode, use_ssl, enable_legacy_translation):
+# Sent as-is when every worker is busy, instead of leaving the client queued with no feedback
+_BUSY_BODY = b'{"error": "Proxy is at capacity, please retry shortly"}'
+_BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"Content-Length: " + str(len(_BUSY_BODY)).encode() + b"\r\n\r\n" + _BUSY_BODY
+)
+
+
+class PooledThreadingTCPServer(socketserver.ThreadingTCPServer):
+    """
+    ThreadingTCPServer that serves connections on a bounded, reused thread pool
+    instead of spawning a new OS thread per connection. Connections beyond
+    `max_workers` get an immediate 503 rather than waiting in the pool queue.
+    """
+    max_workers = DEFAULT_MAX_WORKERS
+
+    def __init__(self, *args, **kwargs):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="proxy-worker")
+        self._free_workers = threading.BoundedSemaphore(self.max_workers)
+        super().__init__(*args, **kwargs)
+
+    def process_request(self, request, client_address):
+        if not self._free_workers.acquire(blocking=False):
+            logger.warning("All %d workers busy; rejecting connection from %s", self.max_workers, client_address[0])
+            try:
+                request.sendall(_BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self._executor.submit(self._process_request_in_worker, request, client_address)
+
+    def _process_request_in_worker(self, request, client_address):
+        # process_request_thread handles errors and always shuts the request down
+        try:
+            self.process_request_thread(request, client_address)
+        finally:
+            self._free_workers.release()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_server(port, cert_dir, dev_mode, use_ssl, enable_legacy_translation, max_workers=DEFAULT_MAX_WORKERS):
     """Configures and starts the proxy server (HTTPS or HTTP)."""
     protocol = "https" if use_ssl else "http"
     logger.info(f"--- Ollama {protocol.upper()} Proxy ---")
+    logger.info("Serving up to %d concurrent connections", max_workers)
 
-    class CustomThreadingTCPServer(socketserver.ThreadingTCPServer):
+    class CustomThreadingTCPServer(PooledThreadingTCPServer):
         allow_reuse_address = True
         def __init__(self, server_address, RequestHandlerClass, bind_and_activate=True):
             # Store all config values on the server instance
             self.dev_mode = dev_mode
             # --- New: Store the translation setting ---
             self.enable_legacy_translation = enable_legacy_translation
+            self.max_workers = max_workers
             super().__init__(server_address, RequestHandlerClass, bind_and_activate)
 
     httpd = CustomThreadingTCPServer(('', port), OllamaProxyHandler)
@@ -32,9 +86,7 @@ def run_server(port, cert_dir, dev_mode, use_ssl, enable_legacy_translation):
         logger.info("SSL is enabled. Preparing certificates...")
         try:
             cert_path, key_path = prepare_certificates(cert_dir)
-            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-            context.minimum_version = ssl.TLSVersion.TLSv1_2
-            context.load_cert_chain(certfile=cert_path, keyfile=key_path)
+            context = create_ssl_context(cert_path, key_path)
             httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
             logger.info("Server is wrapped with SSL.")
         except Exception as e:
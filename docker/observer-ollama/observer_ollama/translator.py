@@ -5,15 +5,17 @@ import logging
 
 logger = logging.getLogger('ollama-proxy.translator')
 
-def translate_request_to_ollama(request_body_bytes):
+def translate_request_to_ollama(request_body_bytes, request_data=None):
     """
     Translates an OpenAI-compatible /v1/chat/completions request 
     to an Ollama-compatible /api/generate request.
+    Pass `request_data` when the caller has already parsed the body, so it isn't decoded twice.
     
     Returns a tuple of (new_path, new_body_bytes).
     """
     try:
-        request_data = json.loads(request_body_bytes)
+        if request_data is None:
+            request_data = json.loads(request_body_bytes)
         model = request_data.get('model', '')
         
         # Default to a passthrough if the structure is not as expected
@@ -67,7 +69,9 @@ def translate_response_to_openai(ollama_response_bytes, model):
     """
     try:
         ollama_response = json.loads(ollama_response_bytes)
-        
+        prompt_tokens = ollama_response.get("prompt_eval_count", -1)
+        completion_tokens = ollama_response.get("eval_count", -1)
+
         openai_response = {
             "id": f"chatcmpl-{time.time()}",
             "object": "chat.completion",
@@ -84,10 +88,10 @@ def translate_response_to_openai(ollama_response_bytes, model):
                 }
             ],
             "usage": {
-                # Ollama provides detailed usage, but we'll fake it for compatibility
-                "prompt_tokens": ollama_response.get("prompt_eval_count", -1),
-                "completion_tokens": ollama_response.get("eval_count", -1),
-                "total_tokens": -1,
+                # Ollama reports real tokenizer counts; -1 marks a count it left out
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens if prompt_tokens >= 0 and completion_tokens >= 0 else -1,
             }
         }
         logger.info("Translated Ollama native response back to OpenAI format")